@@ -0,0 +1,15 @@
+# app/__main__.py - ARRANQUE DE PRODUCCIÓN: STREAMLIT + RUTAS PROPIAS (ASSETS Y KIOSCO) EN EL MISMO PUERTO
+#
+# Uso (desde la raíz del repositorio):
+#   python -m app --server.port=8501 --server.address=0.0.0.0
+#
+# Los argumentos se pasan tal cual a `streamlit run streamlit_app.py`.
+import sys
+from streamlit.web import cli as stcli
+from app.companion import install
+from app.config import BASE_DIR
+
+if __name__ == "__main__":
+    install()
+    sys.argv = ["streamlit", "run", str(BASE_DIR / "streamlit_app.py"), *sys.argv[1:]]
+    sys.exit(stcli.main())
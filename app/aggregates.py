@@ -0,0 +1,79 @@
+# app/aggregates.py - CUBO DE AGREGADOS DEL PRESUPUESTO (UNA VEZ POR VERSIÓN DE DATOS)
+from collections import namedtuple
+import pandas as pd
+from app.cache import data_cache
+from app.config import APP_CONFIG
+
+# Sumas que muestran los componentes del dashboard
+CUBE_SUM_COLUMNS = ['presupuesto_comuna', 'restante_presupuesto_comuna',
+                    'acumulado_legali_comuna', 'numero_usuarios_comuna']
+
+# Niveles del cubo (todas las sumas enteras + fiducias distintas):
+#   total          -> dict con las sumas, 'fiducias' y 'comunas'
+#   estrato        -> DataFrame indexado por es_123 (True = estratos 1-3)
+#   comuna         -> DataFrame indexado por 'Comuna Base'
+#   comuna_estrato -> DataFrame indexado por ('Comuna Base', es_123)
+#   fiducia        -> DataFrame indexado por ('Comuna Base', es_123, idfiducia)
+AggregateCube = namedtuple('AggregateCube', ['total', 'estrato', 'comuna', 'comuna_estrato', 'fiducia'])
+
+def _aggregate(df, by, sort=True):
+    """Sumas (y fiducias distintas) agrupadas por `by`"""
+    named = {col: (col, 'sum') for col in CUBE_SUM_COLUMNS}
+    named['fiducias'] = ('idfiducia', 'nunique')
+    return df.groupby(by, sort=sort).agg(**named)
+
+def build_aggregate_cube(df):
+    """Calcular todos los niveles del cubo en una sola pasada por nivel"""
+    columnas = CUBE_SUM_COLUMNS + ['fiducias']
+    if df.empty or 'es_123' not in df.columns:
+        vacio = pd.DataFrame(columns=columnas)
+        total = {col: 0 for col in columnas}
+        total['comunas'] = 0
+        return AggregateCube(total, vacio, vacio, vacio, vacio)
+
+    total = {col: int(df[col].sum()) for col in CUBE_SUM_COLUMNS}
+    total['fiducias'] = int(df['idfiducia'].nunique())
+    total['comunas'] = int(df['Nombre Comuna'].nunique()) if 'Nombre Comuna' in df.columns else 0
+
+    return AggregateCube(
+        total=total,
+        estrato=_aggregate(df, 'es_123'),
+        comuna=_aggregate(df, 'Comuna Base'),
+        comuna_estrato=_aggregate(df, ['Comuna Base', 'es_123']),
+        # Orden de aparición (como venían las filas) para el detalle de fiducias
+        fiducia=_aggregate(df, ['Comuna Base', 'es_123', 'idfiducia'], sort=False)
+    )
+
+def get_aggregate_cube(df, data_version=None):
+    """
+    Cubo de la versión de datos indicada. Se calcula una sola vez por versión
+    y se comparte entre sesiones (caché versionada del presupuesto del periodo).
+    """
+    if data_version is None:
+        return build_aggregate_cube(df)
+
+    dataset = (APP_CONFIG['table_name'], APP_CONFIG['current_period'])
+    cube = data_cache.get(*dataset, ('cube', data_version))
+    if cube is None:
+        cube = build_aggregate_cube(df)
+        data_cache.set(*dataset, ('cube', data_version), cube)
+    return cube
+
+def _row(frame, key):
+    """Fila del nivel como dict, o None si la llave no existe"""
+    if key not in frame.index:
+        return None
+    return {col: int(value) for col, value in frame.loc[key].items()}
+
+def cube_totals(cube, comuna=None):
+    """
+    Totales y totales por estrato (True = 1-3, False = 4-6) de todo el
+    periodo o de una comuna. Los estratos sin datos quedan en None.
+    """
+    if comuna is None:
+        totales = dict(cube.total)
+        por_estrato = {es_123: _row(cube.estrato, es_123) for es_123 in (True, False)}
+    else:
+        totales = _row(cube.comuna, comuna)
+        por_estrato = {es_123: _row(cube.comuna_estrato, (comuna, es_123)) for es_123 in (True, False)}
+    return totales, por_estrato
@@ -0,0 +1,111 @@
+# app/assets.py - ARCHIVOS ESTÁTICOS CON EL HASH DEL CONTENIDO EN EL NOMBRE
+import hashlib
+import logging
+import mimetypes
+import re
+from pathlib import Path, PurePosixPath
+from app.config import APP_CONFIG, BASE_DIR
+
+logger = logging.getLogger(__name__)
+
+# Extensiones que se publican desde assets/ (CSS y fuentes)
+ASSET_EXTENSIONS = ('.css', '.woff2', '.woff', '.ttf')
+
+# url(...) relativa dentro de un CSS, con su format(...) opcional y la coma que la antecede
+_CSS_URL = re.compile(r"""(\s*,)?\s*url\((['"]?)([^'")]+)\2\)(\s*format\([^)]*\))?""")
+
+class AssetManifest:
+    """
+    Archivos de assets/ publicados con el hash de su contenido en el nombre
+    (css/grid.css -> css/grid.3f2a9c1b04.css).
+
+    Como el nombre cambia cuando cambia el contenido, se pueden servir con
+    caché de un año (immutable): el navegador los descarga una sola vez. Las
+    url() relativas de los CSS se reescriben al nombre con hash del archivo
+    referido; si el archivo no existe (p.ej. una fuente aún no copiada) se
+    quita esa url() y el navegador usa las demás fuentes de `src`.
+    Se construye una sola vez al importar; después es de solo lectura.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self._names = {}   # ruta original ('css/grid.css') -> ruta con hash
+        self._files = {}   # ruta con hash -> (contenido, content-type)
+        self.missing = []  # url() de los CSS que apuntan a archivos que no existen
+        # Prefijo donde companion.mount() publicó /assets en el servidor de
+        # Streamlit ('' = raíz); None si no están montadas (streamlit run directo)
+        self.mounted_at = None
+        self._load()
+        if self.missing:
+            logger.warning("Assets referidos que no existen (se omiten): %s", ", ".join(self.missing))
+
+    def _publish(self, ruta, contenido):
+        digest = hashlib.blake2b(contenido, digest_size=5).hexdigest()
+        original = PurePosixPath(ruta)
+        publicada = str(original.with_name(f"{original.stem}.{digest}{original.suffix}"))
+        content_type = mimetypes.guess_type(original.name)[0] or 'application/octet-stream'
+        if original.suffix == '.css':
+            content_type += '; charset=utf-8'
+        self._names[ruta] = publicada
+        self._files[publicada] = (contenido, content_type)
+
+    def _rewrite_css(self, ruta, texto):
+        """Apuntar las url() relativas del CSS a los nombres con hash"""
+        carpeta = PurePosixPath(ruta).parent
+
+        def reemplazar(m):
+            url = m.group(3)
+            if url.startswith(('data:', 'http:', 'https:', '/')):
+                return m.group(0)
+            destino = self._names.get(str(carpeta / url))
+            if destino is None:
+                self.missing.append(str(carpeta / url))
+                return ''
+            return m.group(0).replace(url, PurePosixPath(destino).name)
+
+        return _CSS_URL.sub(reemplazar, texto)
+
+    def _load(self):
+        archivos = sorted(
+            p for p in self.root.rglob('*')
+            if p.is_file() and p.suffix in ASSET_EXTENSIONS
+        )
+        # Primero los que no son CSS: los CSS necesitan sus nombres con hash
+        for path in sorted(archivos, key=lambda p: p.suffix == '.css'):
+            ruta = path.relative_to(self.root).as_posix()
+            contenido = path.read_bytes()
+            if path.suffix == '.css':
+                contenido = self._rewrite_css(ruta, contenido.decode('utf-8')).encode('utf-8')
+            self._publish(ruta, contenido)
+
+    def url(self, ruta):
+        """Ruta publicada (con hash) de un archivo de assets/, p.ej. 'css/grid.css'"""
+        return self._names[ruta]
+
+    def get(self, publicada):
+        """(contenido, content-type) de una ruta publicada, o None"""
+        return self._files.get(publicada)
+
+    def text(self, ruta):
+        """Contenido publicado (ya reescrito) de un CSS de assets/, como texto"""
+        return self._files[self._names[ruta]][0].decode('utf-8')
+
+# Instancia global (una por proceso, compartida por todas las sesiones)
+asset_manifest = AssetManifest(BASE_DIR / 'assets')
+
+def stylesheet_href(ruta, base="/assets/"):
+    """URL de una hoja de assets/: su ruta con hash bajo `base`"""
+    return f"{base}{asset_manifest.url(ruta)}"
+
+def asset_urls(*rutas):
+    """
+    Para el navegador: las hojas de estilo pedidas como rutas /assets/ con hash
+    (en el mismo origen que Streamlit, o bajo COMPANION_PUBLIC_URL si se
+    configuró). Si las rutas propias no están montadas (`streamlit run` sin
+    `python -m app`), el CSS va en línea para que el grid nunca quede sin estilos
+    (sin /assets no hay woff2: se usa la fuente instalada o sans-serif).
+    """
+    base = APP_CONFIG['companion_public_url'] or asset_manifest.mounted_at
+    if base is None:
+        return {'hrefs': [], 'inline': [asset_manifest.text(ruta) for ruta in rutas]}
+    return {'hrefs': [stylesheet_href(ruta, f"{base}/assets/") for ruta in rutas], 'inline': []}
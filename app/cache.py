@@ -0,0 +1,66 @@
+# app/cache.py - CACHÉ COMPARTIDA VERSIONADA POR CONJUNTO DE DATOS Y PERIODO
+import threading
+from collections import OrderedDict
+
+class VersionedCache:
+    """
+    Caché en memoria compartida por todas las sesiones del proceso.
+
+    Cada entrada pertenece a un conjunto de datos y periodo (p.ej. la tabla de
+    presupuesto del periodo 15), que tiene un contador de versión. Invalidar
+    un conjunto sube su versión y descarta solo sus entradas: lo cacheado de
+    otros conjuntos o periodos se conserva. LRU acotada a `maxsize` entradas.
+    """
+
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self._versions = {}             # (dataset, periodo) -> versión
+        self._entries = OrderedDict()   # (dataset, periodo, versión, llave) -> valor
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'invalidations': 0, 'evicted': 0}
+
+    def version(self, dataset, period):
+        """Versión vigente del conjunto (0 si nunca se ha invalidado)"""
+        with self._lock:
+            return self._versions.get((dataset, period), 0)
+
+    def invalidate(self, dataset, period):
+        """Subir la versión del conjunto y descartar solo sus entradas"""
+        with self._lock:
+            version = self._versions.get((dataset, period), 0) + 1
+            self._versions[(dataset, period)] = version
+            stale = [k for k in self._entries if k[:2] == (dataset, period)]
+            for k in stale:
+                del self._entries[k]
+            self._stats['invalidations'] += 1
+            self._stats['evicted'] += len(stale)
+            return version
+
+    def get(self, dataset, period, key):
+        """Valor cacheado para la versión vigente, o None"""
+        with self._lock:
+            entry_key = (dataset, period, self._versions.get((dataset, period), 0), key)
+            value = self._entries.get(entry_key)
+            if value is None:
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(entry_key)
+            self._stats['hits'] += 1
+            return value
+
+    def set(self, dataset, period, key, value):
+        """Guardar un valor bajo la versión vigente del conjunto"""
+        with self._lock:
+            entry_key = (dataset, period, self._versions.get((dataset, period), 0), key)
+            self._entries[entry_key] = value
+            self._entries.move_to_end(entry_key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        """Contadores de aciertos / fallos / invalidaciones y tamaño actual"""
+        with self._lock:
+            return dict(self._stats, size=len(self._entries))
+
+# Instancia global (una por proceso, compartida por todas las sesiones)
+data_cache = VersionedCache()
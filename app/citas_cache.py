@@ -0,0 +1,72 @@
+# app/citas_cache.py - CACHÉ COMPARTIDA DE BÚSQUEDAS DE CITAS
+import threading
+from cachetools import TTLCache
+from app.config import APP_CONFIG
+from app.singleflight import fetch_flight
+
+class CitasResultCache:
+    """
+    Caché por documento compartida por todas las sesiones del proceso.
+
+    - Resultados con citas: LRU acotada a `maxsize` entradas, vigentes `ttl` segundos
+    - Resultados vacíos ("no hay citas"): caché aparte con TTL corto (`negative_ttl`),
+      para no repetir la consulta pero sí ver pronto una cita recién creada
+    - Los errores de consulta no se guardan
+    """
+
+    def __init__(self, maxsize=500, ttl=300, negative_ttl=60):
+        self._positive = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._negative = TTLCache(maxsize=maxsize, ttl=negative_ttl)
+        self._lock = threading.Lock()  # cachetools no es thread-safe
+        self._stats = {'hits': 0, 'negative_hits': 0, 'misses': 0, 'bypasses': 0}
+
+    def get_or_load(self, documento, loader, force_refresh=False):
+        """
+        Retornar el resultado de citas del documento desde la caché o con `loader`.
+        `loader(documento)` debe retornar un resultado con `.empty` y `.copy()`
+        (DataFrame o página de citas), o None si la consulta falló.
+        Con force_refresh se ignora la caché y se guarda el resultado nuevo.
+        """
+        key = str(documento).strip()
+
+        with self._lock:
+            if force_refresh:
+                self._stats['bypasses'] += 1
+            elif key in self._positive:
+                self._stats['hits'] += 1
+                return self._positive[key].copy()
+            elif key in self._negative:
+                self._stats['negative_hits'] += 1
+                return self._negative[key].copy()
+            else:
+                self._stats['misses'] += 1
+
+        # Sesiones que buscan el mismo documento a la vez comparten una sola consulta
+        resultado = fetch_flight.do(('citas', key, force_refresh), lambda: loader(key))
+        if resultado is None:
+            return None
+
+        with self._lock:
+            self._positive.pop(key, None)
+            self._negative.pop(key, None)
+            if resultado.empty:
+                self._negative[key] = resultado
+            else:
+                self._positive[key] = resultado
+        return resultado.copy()
+
+    def stats(self):
+        """Contadores de aciertos / fallos y tamaño actual"""
+        with self._lock:
+            return dict(
+                self._stats,
+                size=len(self._positive),
+                negative_size=len(self._negative)
+            )
+
+# Instancia global (una por proceso, compartida por todas las sesiones)
+citas_cache = CitasResultCache(
+    maxsize=APP_CONFIG['citas_cache_size'],
+    ttl=APP_CONFIG['citas_cache_ttl'],
+    negative_ttl=APP_CONFIG['citas_negative_ttl']
+)
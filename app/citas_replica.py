@@ -0,0 +1,270 @@
+# app/citas_replica.py - RÉPLICA LOCAL (SQLITE) DE LA VISTA DE CITAS
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, time as dt_time
+from pathlib import Path
+import pandas as pd
+from app.config import APP_CONFIG
+from app.database import db
+from app.utils import extraer_nombres_y_documentos, get_colombia_time
+
+logger = logging.getLogger(__name__)
+
+# Fechas y horas se guardan como texto ISO ('YYYY-MM-DD', 'HH:MM:SS') para que
+# el orden alfabético coincida con el cronológico
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS citas (
+    taquilla TEXT,
+    hora_inicio TEXT,
+    fecha TEXT,
+    estado TEXT,
+    nombre TEXT,
+    fondo TEXT,
+    nombre_persona TEXT,
+    documento TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_citas_documento ON citas (documento, fecha DESC, hora_inicio DESC);
+CREATE INDEX IF NOT EXISTS idx_citas_fecha ON citas (fecha, hora_inicio);
+CREATE TABLE IF NOT EXISTS sync_meta (
+    clave TEXT PRIMARY KEY,
+    valor TEXT
+);
+"""
+
+def _fecha_texto(value):
+    """DATE de MySQL -> 'YYYY-MM-DD'"""
+    if isinstance(value, (date, datetime)):
+        return value.strftime('%Y-%m-%d')
+    return str(value) if value is not None else None
+
+def _hora_texto(value):
+    """TIME de MySQL (llega como timedelta) -> 'HH:MM:SS'"""
+    if isinstance(value, timedelta):
+        total = int(value.total_seconds())
+        return f"{total // 3600:02d}:{(total % 3600) // 60:02d}:{total % 60:02d}"
+    if isinstance(value, (dt_time, datetime)):
+        return value.strftime('%H:%M:%S')
+    return str(value) if value is not None else None
+
+class CitasReplica:
+    """
+    Copia local de la vista de citas en SQLite, indexada por documento y fecha.
+
+    Un hilo en segundo plano sincroniza cada `interval` segundos. La primera vez
+    (y cada `full_sync_hours`) copia todo; el resto del tiempo solo vuelve a
+    copiar las citas desde `lookback_days` antes de la última fecha sincronizada,
+    para recoger citas nuevas y cambios de estado recientes. Las búsquedas del
+    mostrador consultan esta réplica y no el MySQL compartido.
+    """
+
+    def __init__(self, path, interval=120, lookback_days=7, full_sync_hours=24):
+        self.path = Path(path)
+        self.interval = interval
+        self.lookback_days = lookback_days
+        self.full_sync_hours = full_sync_hours
+        self.last_error = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")  # lectores no se bloquean durante la sincronización
+            conn.executescript(SCHEMA_SQL)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(str(self.path), timeout=30)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _get_meta(self, conn, clave):
+        row = conn.execute("SELECT valor FROM sync_meta WHERE clave = ?", (clave,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, conn, clave, valor):
+        conn.execute(
+            "INSERT OR REPLACE INTO sync_meta (clave, valor) VALUES (?, ?)", (clave, valor)
+        )
+
+    @property
+    def last_sync(self):
+        """Hora Colombia de la última sincronización exitosa (None si nunca)"""
+        with self._connect() as conn:
+            valor = self._get_meta(conn, 'ultima_sincronizacion')
+        return datetime.fromisoformat(valor) if valor else None
+
+    def sync(self):
+        """Sincronizar la réplica (completa o incremental según corresponda)"""
+        ahora = get_colombia_time()
+        with self._connect() as conn:
+            watermark = self._get_meta(conn, 'watermark')
+            ultima_completa = self._get_meta(conn, 'ultima_completa')
+
+        completa = (
+            watermark is None or ultima_completa is None
+            or ahora - datetime.fromisoformat(ultima_completa) > timedelta(hours=self.full_sync_hours)
+        )
+        fecha_desde = None
+        if not completa:
+            # El watermark puede estar en el futuro (citas agendadas): no pasar de hoy
+            base = min(date.fromisoformat(watermark), ahora.date())
+            fecha_desde = base - timedelta(days=self.lookback_days)
+
+        result = db.fetch_citas_view(fecha_desde)
+        if result is None:
+            self.last_error = "No se pudo leer la vista de citas"
+            return False
+
+        columns, rows = result
+        pos = {col: i for i, col in enumerate(columns)}
+        # Nombre y documento de toda la vista en una sola pasada vectorizada
+        nombres = pd.Series([row[pos['nombre']] for row in rows], dtype=object)
+        extracciones = extraer_nombres_y_documentos(nombres)
+        registros = [
+            (
+                row[pos['taquilla']],
+                _hora_texto(row[pos['hora_inicio']]),
+                _fecha_texto(row[pos['fecha']]),
+                row[pos['estado']],
+                row[pos['nombre']],
+                row[pos['fondo']],
+                nombre_persona,
+                documento
+            )
+            for row, nombre_persona, documento in zip(
+                rows, extracciones['nombre_persona'], extracciones['documento']
+            )
+        ]
+
+        with self._connect() as conn:
+            with conn:  # una sola transacción: los lectores ven la réplica anterior o la nueva
+                if completa:
+                    conn.execute("DELETE FROM citas")
+                else:
+                    conn.execute("DELETE FROM citas WHERE fecha >= ?", (_fecha_texto(fecha_desde),))
+                conn.executemany(
+                    "INSERT INTO citas VALUES (?, ?, ?, ?, ?, ?, ?, ?)", registros
+                )
+                max_fecha = conn.execute("SELECT MAX(fecha) FROM citas").fetchone()[0]
+                if max_fecha:
+                    self._set_meta(conn, 'watermark', max_fecha)
+                self._set_meta(conn, 'ultima_sincronizacion', ahora.isoformat())
+                if completa:
+                    self._set_meta(conn, 'ultima_completa', ahora.isoformat())
+
+        self.last_error = None
+        return True
+
+    def _run(self):
+        while True:
+            try:
+                self.sync()
+            except Exception as e:
+                self.last_error = str(e)
+                logger.exception("Error sincronizando la réplica de citas")
+            time.sleep(self.interval)
+
+    def start(self):
+        """Arrancar el hilo de sincronización (idempotente)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="citas-replica", daemon=True)
+            self._thread.start()
+
+    def lookup_page(self, documento, limit, after=None):
+        """
+        Una página de citas del documento (fecha DESC, hora_inicio DESC) con
+        paginación por llave: `after` es el cursor (fecha, hora_inicio, taquilla)
+        de la última fila de la página anterior. La taquilla desempata citas con
+        la misma fecha y hora; no se usa el rowid porque cada sincronización
+        borra y vuelve a insertar las citas recientes (cambia su rowid), y un
+        cursor de antes de la sincronización saltaría o repetiría filas.
+
+        Retorna (filas, cursor siguiente o None si no hay más, resumen), donde
+        resumen es (total, asistidas) calculado en SQL solo para la primera
+        página (None en las siguientes). Retorna None si la réplica nunca se ha
+        sincronizado.
+        """
+        self.start()
+        documento = str(documento).strip()
+        where, params = "documento = ?", [documento]
+        if after is not None:
+            where += " AND (fecha, hora_inicio, COALESCE(taquilla, '')) < (?, ?, ?)"
+            params.extend(after)
+
+        with self._connect() as conn:
+            if self._get_meta(conn, 'ultima_sincronizacion') is None:
+                return None
+            conn.row_factory = sqlite3.Row
+            # Conteo y página en la misma transacción de lectura (misma versión de la réplica)
+            conn.execute("BEGIN")
+            resumen = None
+            if after is None:
+                # Mismo criterio que la página: estado que contiene "asistida" (sin mayúsculas)
+                total, asistidas = conn.execute(
+                    """
+                    SELECT COUNT(*), COALESCE(SUM(estado LIKE '%asistida%'), 0)
+                    FROM citas
+                    WHERE documento = ?
+                    """,
+                    (documento,)
+                ).fetchone()
+                resumen = (total, asistidas)
+            rows = conn.execute(
+                f"""
+                SELECT taquilla, hora_inicio, fecha, estado, nombre, fondo
+                FROM citas
+                WHERE {where}
+                ORDER BY fecha DESC, hora_inicio DESC, COALESCE(taquilla, '') DESC
+                LIMIT ?
+                """,
+                params + [limit + 1]  # una fila de más para saber si hay otra página
+            ).fetchall()
+            conn.commit()
+
+        cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            ultima = rows[-1]
+            cursor = (ultima['fecha'], ultima['hora_inicio'], ultima['taquilla'] or '')
+
+        return [dict(row) for row in rows], cursor, resumen
+
+    def lookup_many(self, documentos):
+        """
+        Citas de varios documentos en una sola consulta (documento IN (...)).
+        Retorna None si la réplica nunca se ha sincronizado.
+        """
+        self.start()
+        documentos = [str(doc).strip() for doc in documentos]
+        if not documentos:
+            return []
+        placeholders = ", ".join(["?"] * len(documentos))
+        with self._connect() as conn:
+            if self._get_meta(conn, 'ultima_sincronizacion') is None:
+                return None
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(
+                f"""
+                SELECT taquilla, hora_inicio, fecha, estado, nombre, fondo
+                FROM citas
+                WHERE documento IN ({placeholders})
+                ORDER BY documento, fecha DESC, hora_inicio DESC
+                """,
+                documentos
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+# Instancia global (una por proceso, compartida por todas las sesiones)
+citas_replica = CitasReplica(
+    APP_CONFIG['citas_replica_path'],
+    interval=APP_CONFIG['citas_sync_interval'],
+    lookback_days=APP_CONFIG['citas_sync_lookback_days'],
+    full_sync_hours=APP_CONFIG['citas_full_sync_hours']
+)
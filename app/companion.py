@@ -0,0 +1,82 @@
+# app/companion.py - RUTAS PROPIAS SOBRE EL SERVIDOR TORNADO DE STREAMLIT: ASSETS Y KIOSCO
+import asyncio
+import logging
+import threading
+import tornado.web
+from streamlit import config as st_config
+from streamlit.web.server import server as st_server
+from streamlit.web.server.server_util import make_url_path_regex
+from app.assets import asset_manifest
+from app.kiosk import KioskHandler, KioskHealthHandler
+from app.live_events import KioskEventsHandler, live_events
+from app.snapshot import refresher
+
+logger = logging.getLogger(__name__)
+
+# Los nombres llevan el hash del contenido: nunca cambian, se pueden guardar un año
+ASSET_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+class AssetHandler(tornado.web.RequestHandler):
+    """GET /assets/<ruta con hash>: CSS y fuentes con caché larga"""
+
+    def set_default_headers(self):
+        # Si se publican desde otro origen (COMPANION_PUBLIC_URL), las fuentes requieren CORS
+        self.set_header("Access-Control-Allow-Origin", "*")
+
+    def get(self, ruta):
+        asset = asset_manifest.get(ruta)
+        if asset is None:
+            raise tornado.web.HTTPError(404)
+        contenido, content_type = asset
+        self.set_header("Content-Type", content_type)
+        self.set_header("Cache-Control", ASSET_CACHE_CONTROL)
+        self.write(contenido)  # Tornado agrega ETag y responde 304 si coincide
+
+def companion_routes(base=""):
+    """Rutas propias bajo server.baseUrlPath de Streamlit"""
+    return [
+        (make_url_path_regex(base, "assets/(.*)", trailing_slash="prohibited"), AssetHandler),
+        # Sin barra final: el kiosco pide sus CSS con rutas relativas (assets/...)
+        (make_url_path_regex(base, "kiosk", trailing_slash="prohibited"), KioskHandler),
+        (make_url_path_regex(base, "kiosk/events"), KioskEventsHandler),
+        (make_url_path_regex(base, "kiosk/health"), KioskHealthHandler),
+    ]
+
+def mount(app, base=""):
+    """
+    Registrar las rutas propias en la aplicación Tornado de Streamlit. Van en
+    el mismo puerto y origen que la app (Cloud Run enruta un solo puerto) y
+    antes que las de Streamlit, cuyo comodín serviría su index.html.
+    Se llama dentro de Server.start(), ya en el event loop del servidor.
+    """
+    app.add_handlers(r".*$", companion_routes(base))
+    prefijo = "/" + base.strip("/") if base.strip("/") else ""
+    asset_manifest.mounted_at = prefijo
+    live_events.attach(asyncio.get_running_loop())
+    # Datos desde el arranque del proceso: las pantallas no esperan a que alguien
+    # abra el dashboard (se restaura el snapshot del disco y empieza a refrescar)
+    refresher.start()
+    logger.info("Rutas propias montadas en %s/assets y %s/kiosk", prefijo, prefijo)
+
+_install_lock = threading.Lock()
+_installed = False
+
+def install():
+    """
+    Montar las rutas propias cada vez que Streamlit cree su aplicación Tornado
+    (idempotente). Debe llamarse antes de arrancar Streamlit: lo hace
+    `python -m app`, el punto de entrada de producción.
+    """
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        create_app = st_server.Server._create_app
+
+        def _create_app(server):
+            app = create_app(server)
+            mount(app, st_config.get_option("server.baseUrlPath"))
+            return app
+
+        st_server.Server._create_app = _create_app
+        _installed = True
@@ -1,12 +1,13 @@
 # app/components/__init__.py
 from .cards import create_tv_cards_grid
-from .header import render_header
+from .header import render_header, render_control_bar, render_staleness_badge
 from .metrics import render_global_metrics, render_comuna_metrics
 from .tables import create_summary_table
 
 __all__ = [
     'render_header',
     'render_control_bar',
+    'render_staleness_badge',
     'render_global_metrics',
     'render_comuna_metrics',
     'create_tv_cards_grid',
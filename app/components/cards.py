@@ -1,7 +1,16 @@
 # app/components/cards.py - CON VALORES COMPLETOS Y ENTEROS
+import hashlib
+import threading
+from pathlib import Path
 import pandas as pd
 import streamlit as st
 import streamlit.components.v1 as components
+from cachetools import LRUCache
+from jinja2 import Environment
+from app.aggregates import build_aggregate_cube, cube_totals
+from app.assets import asset_urls
+from app.cache import data_cache
+from app.config import APP_CONFIG
 from app.utils import get_comuna_numero  # Importar función centralizada
 
 # Mapeo de comunas con sus números (se mantiene por compatibilidad, pero se usará de utils)
@@ -29,6 +38,90 @@ COMUNA_NUMEROS = {
     "SANTA ELENA": "90"
 }
 
+# Los datos del grid se guardan en la caché versionada del presupuesto del periodo:
+# se descartan cuando el refrescador publica datos nuevos o se presiona ACTUALIZAR
+_BUDGET_DATASET = (APP_CONFIG['table_name'], APP_CONFIG['current_period'])
+
+def _get_cached_grid_payload(cache_key):
+    if cache_key is None:
+        return None
+    return data_cache.get(*_BUDGET_DATASET, ('grid_payload', cache_key))
+
+def _store_grid_payload(cache_key, payload):
+    if cache_key is None:
+        return
+    data_cache.set(*_BUDGET_DATASET, ('grid_payload', cache_key), payload)
+
+# HTML de cada sección de comuna para la página del kiosco (app/kiosk.py), por hash
+# de su contenido (resúmenes + filas de fiducias). No depende de la versión de datos:
+# si una comuna no cambió entre refrescos se reutiliza su HTML y solo se vuelven a
+# generar las que cambiaron. El dashboard no usa HTML: su grid recibe el payload.
+_SECTION_HTML_CACHE = LRUCache(maxsize=128)
+_SECTION_HTML_LOCK = threading.Lock()  # cachetools no es thread-safe
+_SECTION_HTML_STATS = {'hits': 0, 'misses': 0}
+
+def _section_content_hash(comuna, data):
+    """Hash del contenido que determina el HTML de la sección de una comuna"""
+    h = hashlib.blake2b(str(comuna).encode('utf-8'), digest_size=16)
+    for estrato in ('123', '456'):
+        h.update(repr(data[f'resumen_{estrato}']).encode('utf-8'))
+        fiducias = data[f'fiducias_{estrato}']
+        if not fiducias.empty:
+            # Hash por fila (valores y orden; el índice no influye en el HTML)
+            h.update(pd.util.hash_pandas_object(fiducias, index=False).to_numpy().tobytes())
+        h.update(b'|')
+    return h.digest()
+
+def _render_comuna_section_cached(comuna, data):
+    """HTML de la sección de la comuna, reutilizado si su contenido no cambió"""
+    key = _section_content_hash(comuna, data)
+    with _SECTION_HTML_LOCK:
+        section_html = _SECTION_HTML_CACHE.get(key)
+        if section_html is not None:
+            _SECTION_HTML_STATS['hits'] += 1
+            return section_html
+        _SECTION_HTML_STATS['misses'] += 1
+    
+    section_html = create_comuna_section(
+        comuna_nombre=comuna,
+        resumen_123=data['resumen_123'],
+        fiducias_123=data['fiducias_123'],
+        resumen_456=data['resumen_456'],
+        fiducias_456=data['fiducias_456']
+    )
+    with _SECTION_HTML_LOCK:
+        _SECTION_HTML_CACHE[key] = section_html
+    return section_html
+
+def get_section_cache_stats():
+    """Aciertos / fallos de la caché de secciones y tamaño actual"""
+    with _SECTION_HTML_LOCK:
+        return dict(_SECTION_HTML_STATS, size=len(_SECTION_HTML_CACHE))
+
+# Plantilla y script del componente del grid en vivo
+_GRID_FRONTEND_DIR = Path(__file__).parent / "fiducias_grid"
+
+# Grid en vivo: componente bidireccional servido desde _GRID_FRONTEND_DIR. El iframe
+# carga plantilla, CSS, fuentes y script una sola vez; en cada refresco solo recibe
+# los números (build_fiducias_payload) y devuelve la comuna en la que se hizo clic.
+_fiducias_grid_component = None
+FIDUCIAS_GRID_KEY = "fiducias_grid"
+
+def _grid_component():
+    """
+    Declarar el componente al dibujarlo por primera vez y no al importar:
+    Streamlit solo lo registra si hay un script en ejecución, y este módulo
+    también se importa al arrancar el servidor (kiosco), antes de cualquier sesión.
+    """
+    global _fiducias_grid_component
+    if _fiducias_grid_component is None:
+        _fiducias_grid_component = components.declare_component("fiducias_grid", path=str(_GRID_FRONTEND_DIR))
+    return _fiducias_grid_component
+
+# Hojas de estilo del grid (en assets/): se sirven en /assets con el hash del
+# contenido en el nombre, así que el navegador las descarga una sola vez
+GRID_STYLESHEETS = ('fonts/fonts.css', 'css/grid.css')
+
 def format_currency_complete(value):
     """Formatear valor como moneda COMPLETA sin abreviaturas - SOLO ENTEROS"""
     if pd.isna(value) or value is None:
@@ -73,58 +166,80 @@ def get_urgency_status(percentage):
     else:
         return "available", "MUY DISPONIBLE"
 
-def create_estrato_resumen_card(estrato_text, estrato_class,
-                               presupuesto, restante, usuarios, porcentaje, has_data=True):
-    """Crear tarjeta de resumen para un estrato"""
-    
-    if not has_data:
-        return f'''
+# Plantillas Jinja2 de las tarjetas del grid del kiosco: se compilan una sola vez al importar.
+# Reciben registros planos ya formateados (sin iterrows) y el texto es idéntico al
+# de las antiguas f-strings. Sin autoescape: el contenido es el mismo que antes.
+_JINJA_ENV = Environment(autoescape=False, keep_trailing_newline=True)
+
+_FIDUCIA_ITEM_SOURCE = '''
+        <div class="fiducia-item">
+            <div class="fiducia-header">
+                <div class="fiducia-id">Fiducia {{ f.id }}</div>
+                <div class="fiducia-porcentaje" style="color: {{ f.color }};">{{ f.porcentaje_texto }}%</div>
+            </div>
+            
+            <div class="fiducias-metrics">
+                <div class="fiducia-metric">
+                    <div class="fiducia-metric-label">Presupuesto</div>
+                    <div class="fiducia-metric-value">{{ f.presupuesto }}</div>
+                </div>
+                <div class="fiducia-metric">
+                    <div class="fiducia-metric-label">Restante</div>
+                    <div class="fiducia-metric-value available">{{ f.restante }}</div>
+                </div>
+            </div>
+            
+            <div class="fiducias-progress">
+                <div class="fiducia-progress-bar">
+                    <div class="fiducia-progress-fill" style="width: {{ f.porcentaje }}%; background: {{ f.color }};"></div>
+                </div>
+            </div>
+        </div>
+        '''
+
+_RESUMEN_NO_DATA_TEMPLATE = _JINJA_ENV.from_string('''
         <div class="estrato-resumen-card no-data">
             <div class="estrato-resumen-header">
-                <div class="estrato-resumen-title">{estrato_text}</div>
-                <div class="estrato-resumen-badge {estrato_class}">RESUMEN</div>
+                <div class="estrato-resumen-title">{{ estrato_text }}</div>
+                <div class="estrato-resumen-badge {{ estrato_class }}">RESUMEN</div>
             </div>
             
             <div class="no-data-state">
                 <div class="no-data-icon">📭</div>
                 <div class="no-data-title">NO APLICA</div>
-                <div class="no-data-text">Esta comuna no tiene {estrato_text.replace("ESTRATOS ", "")}</div>
+                <div class="no-data-text">Esta comuna no tiene {{ estrato_corto }}</div>
             </div>
         </div>
-        '''
-    
-    consumido = presupuesto - restante
-    bar_color = get_status_color_tv(porcentaje)
-    urgency_class, urgency_text = get_urgency_status(porcentaje)
-    
-    return f'''
-    <div class="estrato-resumen-card {urgency_class}">
+        ''')
+
+_RESUMEN_TEMPLATE = _JINJA_ENV.from_string('''
+    <div class="estrato-resumen-card {{ urgency_class }}">
         <!-- Encabezado del estrato -->
         <div class="estrato-resumen-header">
-            <div class="estrato-resumen-title">{estrato_text}</div>
-            <div class="estrato-resumen-badge {estrato_class}">RESUMEN</div>
+            <div class="estrato-resumen-title">{{ estrato_text }}</div>
+            <div class="estrato-resumen-badge {{ estrato_class }}">RESUMEN</div>
         </div>
         
         <!-- Estado de urgencia -->
-        <div class="estrato-resumen-status {urgency_class}">
-            <span class="estrato-resumen-status-text">{urgency_text}</span>
+        <div class="estrato-resumen-status {{ urgency_class }}">
+            <span class="estrato-resumen-status-text">{{ urgency_text }}</span>
         </div>
         
         <!-- Métricas principales -->
         <div class="estrato-resumen-metrics">
             <div class="estrato-metric-row">
                 <span class="estrato-metric-label">Presupuesto Total</span>
-                <span class="estrato-metric-value">{format_currency_complete(presupuesto)}</span>
+                <span class="estrato-metric-value">{{ presupuesto }}</span>
             </div>
             
             <div class="estrato-metric-row">
                 <span class="estrato-metric-label" style="color: #1a73e8;">Restante</span>
-                <span class="estrato-metric-value" style="color: #1a73e8;">{format_currency_complete(restante)}</span>
+                <span class="estrato-metric-value" style="color: #1a73e8;">{{ restante }}</span>
             </div>
             
             <div class="estrato-metric-row">
                 <span class="estrato-metric-label" style="color: #34a853;">Legalizados</span>
-                <span class="estrato-metric-value" style="color: #34a853;">{format_number_integer(usuarios)}</span>
+                <span class="estrato-metric-value" style="color: #34a853;">{{ usuarios }}</span>
             </div>
         </div>
         
@@ -132,90 +247,142 @@ def create_estrato_resumen_card(estrato_text, estrato_class,
         <div class="estrato-resumen-progress">
             <div class="estrato-resumen-progress-info">
                 <span class="estrato-resumen-progress-label">Utilización</span>
-                <span class="estrato-resumen-progress-value" style="color: {bar_color};">{porcentaje:.1f}%</span>
+                <span class="estrato-resumen-progress-value" style="color: {{ bar_color }};">{{ porcentaje_texto }}%</span>
             </div>
             <div class="estrato-resumen-progress-bar">
-                <div class="estrato-resumen-progress-fill" style="width: {porcentaje}%; background: {bar_color};"></div>
+                <div class="estrato-resumen-progress-fill" style="width: {{ porcentaje }}%; background: {{ bar_color }};"></div>
             </div>
         </div>
     </div>
-    '''
+    ''')
 
-def create_fiducias_card(fiducias_data, estrato_text, has_data=True):
-    """Crear tarjeta con detalle de fiducias - VALORES ENTEROS"""
-    
-    if not has_data or fiducias_data.empty:
-        return f'''
+_FIDUCIAS_NO_DATA_TEMPLATE = _JINJA_ENV.from_string('''
         <div class="fiducias-card no-data">
             <div class="fiducias-header no-data">
-                <div class="fiducias-title">FIDUCIAS {estrato_text}</div>
+                <div class="fiducias-title">FIDUCIAS {{ estrato_text }}</div>
             </div>
             <div class="no-data-state">
                 <div class="no-data-icon">📭</div>
                 <div class="no-data-title">NO APLICA</div>
-                <div class="no-data-text">Esta comuna no tiene {estrato_text.replace("ESTRATOS ", "")}</div>
+                <div class="no-data-text">Esta comuna no tiene {{ estrato_corto }}</div>
             </div>
         </div>
-        '''
-    
-    # Ordenar fiducias por mayor a menor presupuesto
-    fiducias_data = fiducias_data.sort_values('presupuesto_comuna', ascending=False)
-    
-    # Generar HTML para cada fiducia
-    fiducias_html = ""
-    for _, fiducia in fiducias_data.iterrows():
-        fiducia_id = fiducia.get('idfiducia', 'N/A')
-        
-        # Asegurar que los valores sean enteros
-        try:
-            presupuesto = int(float(fiducia['presupuesto_comuna']))
-            restante = int(float(fiducia['restante_presupuesto_comuna']))
-        except (ValueError, TypeError):
-            presupuesto = 0
-            restante = 0
-            
-        consumido = presupuesto - restante
-        porcentaje = (consumido / presupuesto * 100) if presupuesto > 0 else 0
-        bar_color = get_status_color_tv(porcentaje)
-        
-        fiducias_html += f'''
-        <div class="fiducia-item">
-            <div class="fiducia-header">
-                <div class="fiducia-id">Fiducia {fiducia_id}</div>
-                <div class="fiducia-porcentaje" style="color: {bar_color};">{porcentaje:.1f}%</div>
-            </div>
-            
-            <div class="fiducias-metrics">
-                <div class="fiducia-metric">
-                    <div class="fiducia-metric-label">Presupuesto</div>
-                    <div class="fiducia-metric-value">{format_currency_complete(presupuesto)}</div>
-                </div>
-                <div class="fiducia-metric">
-                    <div class="fiducia-metric-label">Restante</div>
-                    <div class="fiducia-metric-value available">{format_currency_complete(restante)}</div>
-                </div>
-            </div>
-            
-            <div class="fiducias-progress">
-                <div class="fiducia-progress-bar">
-                    <div class="fiducia-progress-fill" style="width: {porcentaje}%; background: {bar_color};"></div>
-                </div>
-            </div>
-        </div>
-        '''
-    
-    return f'''
+        ''')
+
+# La tarjeta incluye el ítem de fiducia en un bucle: todo el HTML sale de un solo render
+_FIDUCIAS_CARD_TEMPLATE = _JINJA_ENV.from_string('''
     <div class="fiducias-card">
         <div class="fiducias-header">
-            <div class="fiducias-title">📦 FIDUCIAS {estrato_text}</div>
-            <div class="fiducias-count">{len(fiducias_data)} fiducia(s)</div>
+            <div class="fiducias-title">📦 FIDUCIAS {{ estrato_text }}</div>
+            <div class="fiducias-count">{{ fiducias|length }} fiducia(s)</div>
         </div>
         
         <div class="fiducias-list">
-            {fiducias_html}
+            {% for f in fiducias %}''' + _FIDUCIA_ITEM_SOURCE + '''{% endfor %}
         </div>
     </div>
-    '''
+    ''')
+
+_ESTRATO_ROW_TEMPLATE = _JINJA_ENV.from_string('''
+    <div class="estrato-row">
+        <!-- Tarjeta de resumen (izquierda) -->
+        {{ resumen_card }}
+        
+        <!-- Tarjeta de fiducias (derecha) -->
+        {{ fiducias_card }}
+    </div>
+    ''')
+
+_COMUNA_SECTION_TEMPLATE = _JINJA_ENV.from_string('''
+    <div class="comuna-section">
+        <!-- Encabezado de la comuna -->
+        <div class="comuna-section-header">
+            <div class="comuna-section-numero">{{ comuna_numero }}</div>
+            <div class="comuna-section-nombre">{{ comuna_nombre }}</div>
+        </div>
+        
+        <!-- Línea 1: Estratos 1-3 -->
+        {{ fila_123 }}
+        
+        <!-- Línea 2: Estratos 4-6 -->
+        {{ fila_456 }}
+    </div>
+    ''')
+
+def create_estrato_resumen_card(estrato_text, estrato_class,
+                               presupuesto, restante, usuarios, porcentaje, has_data=True):
+    """Crear tarjeta de resumen para un estrato"""
+    
+    if not has_data:
+        return _RESUMEN_NO_DATA_TEMPLATE.render(
+            estrato_text=estrato_text,
+            estrato_class=estrato_class,
+            estrato_corto=estrato_text.replace("ESTRATOS ", "")
+        )
+    
+    urgency_class, urgency_text = get_urgency_status(porcentaje)
+    
+    return _RESUMEN_TEMPLATE.render(
+        estrato_text=estrato_text,
+        estrato_class=estrato_class,
+        urgency_class=urgency_class,
+        urgency_text=urgency_text,
+        presupuesto=format_currency_complete(presupuesto),
+        restante=format_currency_complete(restante),
+        usuarios=format_number_integer(usuarios),
+        bar_color=get_status_color_tv(porcentaje),
+        porcentaje=porcentaje,
+        porcentaje_texto=f"{porcentaje:.1f}"
+    )
+
+def _fiducia_valores(fiducias_data):
+    """
+    (ids, presupuestos, restantes) de las fiducias, de mayor a menor presupuesto.
+    Las conversiones a entero se hacen por columna, no fila por fila.
+    """
+    # Ordenar fiducias por mayor a menor presupuesto
+    fiducias_data = fiducias_data.sort_values('presupuesto_comuna', ascending=False)
+    
+    # Asegurar que los valores sean enteros (si alguno no es numérico, ambos quedan en 0)
+    presupuestos = pd.to_numeric(fiducias_data['presupuesto_comuna'], errors='coerce')
+    restantes = pd.to_numeric(fiducias_data['restante_presupuesto_comuna'], errors='coerce')
+    invalidos = presupuestos.isna() | restantes.isna()
+    presupuestos = presupuestos.mask(invalidos, 0).astype(float).astype('int64').tolist()
+    restantes = restantes.mask(invalidos, 0).astype(float).astype('int64').tolist()
+    if 'idfiducia' in fiducias_data.columns:
+        ids = fiducias_data['idfiducia'].tolist()
+    else:
+        ids = ['N/A'] * len(presupuestos)
+    return ids, presupuestos, restantes
+
+def fiducia_records(fiducias_data):
+    """Registros planos (ya formateados) de las fiducias, de mayor a menor presupuesto"""
+    records = []
+    for fiducia_id, presupuesto, restante in zip(*_fiducia_valores(fiducias_data)):
+        porcentaje = ((presupuesto - restante) / presupuesto * 100) if presupuesto > 0 else 0
+        records.append({
+            'id': fiducia_id,
+            'presupuesto': format_currency_complete(presupuesto),
+            'restante': format_currency_complete(restante),
+            'porcentaje': porcentaje,
+            'porcentaje_texto': f"{porcentaje:.1f}",
+            'color': get_status_color_tv(porcentaje)
+        })
+    return records
+
+def create_fiducias_card(fiducias_data, estrato_text, has_data=True):
+    """Crear tarjeta con detalle de fiducias - VALORES ENTEROS"""
+    
+    if not has_data or fiducias_data.empty:
+        return _FIDUCIAS_NO_DATA_TEMPLATE.render(
+            estrato_text=estrato_text,
+            estrato_corto=estrato_text.replace("ESTRATOS ", "")
+        )
+    
+    return _FIDUCIAS_CARD_TEMPLATE.render(
+        estrato_text=estrato_text,
+        fiducias=fiducia_records(fiducias_data)
+    )
 
 def create_comuna_estrato_row(comuna_nombre, estrato_text, estrato_class, 
                             resumen_data, fiducias_data):
@@ -237,10 +404,8 @@ def create_comuna_estrato_row(comuna_nombre, estrato_text, estrato_class,
     else:
         presupuesto = restante = usuarios = porcentaje = 0
     
-    return f'''
-    <div class="estrato-row">
-        <!-- Tarjeta de resumen (izquierda) -->
-        {create_estrato_resumen_card(
+    return _ESTRATO_ROW_TEMPLATE.render(
+        resumen_card=create_estrato_resumen_card(
             estrato_text=estrato_text,
             estrato_class=estrato_class,
             presupuesto=presupuesto,
@@ -248,12 +413,9 @@ def create_comuna_estrato_row(comuna_nombre, estrato_text, estrato_class,
             usuarios=usuarios,
             porcentaje=porcentaje,
             has_data=has_data
-        )}
-        
-        <!-- Tarjeta de fiducias (derecha) -->
-        {create_fiducias_card(fiducias_data, estrato_text, has_data)}
-    </div>
-    '''
+        ),
+        fiducias_card=create_fiducias_card(fiducias_data, estrato_text, has_data)
+    )
 
 def create_comuna_section(comuna_nombre, resumen_123, fiducias_123, resumen_456, fiducias_456):
     """Crear sección completa para una comuna"""
@@ -261,36 +423,136 @@ def create_comuna_section(comuna_nombre, resumen_123, fiducias_123, resumen_456,
     # Usar la función importada desde utils.py
     comuna_numero = get_comuna_numero(comuna_nombre)
     
-    return f'''
-    <div class="comuna-section">
-        <!-- Encabezado de la comuna -->
-        <div class="comuna-section-header">
-            <div class="comuna-section-numero">{comuna_numero}</div>
-            <div class="comuna-section-nombre">{comuna_nombre}</div>
-        </div>
-        
-        <!-- Línea 1: Estratos 1-3 -->
-        {create_comuna_estrato_row(
+    return _COMUNA_SECTION_TEMPLATE.render(
+        comuna_numero=comuna_numero,
+        comuna_nombre=comuna_nombre,
+        fila_123=create_comuna_estrato_row(
             comuna_nombre=comuna_nombre,
             estrato_text="ESTRATOS 1-3",
             estrato_class="estrato-123",
             resumen_data=resumen_123,
             fiducias_data=fiducias_123
-        )}
-        
-        <!-- Línea 2: Estratos 4-6 -->
-        {create_comuna_estrato_row(
+        ),
+        fila_456=create_comuna_estrato_row(
             comuna_nombre=comuna_nombre,
             estrato_text="ESTRATOS 4-6",
             estrato_class="estrato-456",
             resumen_data=resumen_456,
             fiducias_data=fiducias_456
-        )}
-    </div>
-    '''
+        )
+    )
+
+def partition_fiducias(df):
+    """
+    Partir las filas por (comuna base, es_123) en una sola pasada agrupada.
+    Retorna {(comuna, es_123): DataFrame con idfiducia, presupuesto y restante}
+    """
+    if df.empty:
+        return {}
+    
+    # Posiciones de cada grupo (un solo hash de las llaves) y un take por grupo
+    datos = df[['idfiducia', 'presupuesto_comuna', 'restante_presupuesto_comuna']]
+    posiciones = df.groupby(['Comuna Base', 'es_123'], sort=False).indices
+    return {
+        (comuna, bool(es_123)): datos.take(filas)
+        for (comuna, es_123), filas in posiciones.items()
+    }
+
+def _comunas_data(comunas_finales, particiones, cube):
+    """
+    Resúmenes y fiducias de cada comuna y estrato. `particiones` viene de
+    partition_fiducias; los resúmenes se leen del cubo de agregados.
+    """
+    
+    def resumen(comuna, es_123):
+        if (comuna, es_123) not in particiones or (comuna, es_123) not in cube.comuna_estrato.index:
+            return None
+        fila = cube.comuna_estrato.loc[(comuna, es_123)]
+        return {
+            'presupuesto_comuna': int(fila['presupuesto_comuna']),
+            'restante_presupuesto_comuna': int(fila['restante_presupuesto_comuna']),
+            'numero_usuarios_comuna': int(fila['numero_usuarios_comuna'])
+        }
+    
+    # Preparar datos agrupados por comuna - ASEGURAR VALORES ENTEROS
+    comunas_data = {}
+    
+    for comuna in comunas_finales:
+        # Datos para Estratos 1-3 y 4-6 (búsqueda directa en el mapa de particiones)
+        resumen_123 = resumen(comuna, True)
+        resumen_456 = resumen(comuna, False)
+        
+        comunas_data[comuna] = {
+            'resumen_123': resumen_123,
+            'fiducias_123': particiones[(comuna, True)] if resumen_123 is not None else pd.DataFrame(),
+            'resumen_456': resumen_456,
+            'fiducias_456': particiones[(comuna, False)] if resumen_456 is not None else pd.DataFrame()
+        }
+    return comunas_data
+
+def ordenar_comunas(comunas):
+    """Comunas ordenadas por su número (las que no tienen número van al final)"""
+    comunas_ordenadas = []
+    for comuna in comunas:
+        numero = get_comuna_numero(comuna)
+        comunas_ordenadas.append((int(numero) if numero.isdigit() else 99, comuna))
+    
+    comunas_ordenadas.sort(key=lambda x: x[0])
+    return [comuna for _, comuna in comunas_ordenadas]
 
-def create_fiducias_grid(df, grupo_estrato="Todos"):
-    """Crear grid con nueva estructura de fiducias - VALORES ENTEROS"""
+def build_fiducias_sections_html(comunas_finales, particiones, cube):
+    """HTML de las secciones de las comunas indicadas, para la página del kiosco"""
+    comunas_data = _comunas_data(comunas_finales, particiones, cube)
+    
+    # Generar secciones para cada comuna (solo se re-generan las que cambiaron)
+    return ''.join(_render_comuna_section_cached(comuna, comunas_data[comuna]) for comuna in comunas_finales)
+
+def build_fiducias_payload(comunas_finales, particiones, cube):
+    """
+    Datos del grid en vivo: solo los números de cada comuna y estrato (el
+    formato, los colores y el HTML los pone el componente en el navegador).
+    
+    {'comunas': [{'nombre', 'numero', 'estratos': [estrato_123, estrato_456]}]}
+    donde cada estrato es {'resumen': [presupuesto, restante, usuarios] o None,
+    'fiducias': [[id, presupuesto, restante], ...]} (mayor a menor presupuesto).
+    """
+    comunas_data = _comunas_data(comunas_finales, particiones, cube)
+    
+    def estrato(resumen, fiducias):
+        if resumen is None:
+            return {'resumen': None, 'fiducias': []}
+        filas = zip(*_fiducia_valores(fiducias)) if not fiducias.empty else []
+        return {
+            'resumen': [
+                resumen['presupuesto_comuna'],
+                resumen['restante_presupuesto_comuna'],
+                resumen['numero_usuarios_comuna']
+            ],
+            # El id va como texto, igual que en la tarjeta HTML
+            'fiducias': [[str(i), p, r] for i, p, r in filas]
+        }
+    
+    return {'comunas': [
+        {
+            'nombre': comuna,
+            'numero': get_comuna_numero(comuna),
+            'estratos': [
+                estrato(comunas_data[comuna]['resumen_123'], comunas_data[comuna]['fiducias_123']),
+                estrato(comunas_data[comuna]['resumen_456'], comunas_data[comuna]['fiducias_456'])
+            ]
+        }
+        for comuna in comunas_finales
+    ]}
+
+def create_fiducias_grid(df, grupo_estrato="Todos", cache_key=None, cube=None, comuna_filtro=None):
+    """
+    Crear grid con nueva estructura de fiducias - VALORES ENTEROS
+    cache_key (opcional) identifica datos + filtro para reutilizar los datos del grid.
+    cube (opcional) es el cubo de agregados de todo el periodo; `comuna_filtro` indica
+    que `df` ya viene filtrado a esa comuna. Sin cubo se calcula uno para `df`.
+    El último clic en el encabezado de una comuna queda en
+    st.session_state[FIDUCIAS_GRID_KEY] como {'comuna': nombre, 'clic': marca de tiempo}.
+    """
     
     if df.empty:
         st.warning("📭 No hay datos para mostrar")
@@ -302,19 +564,19 @@ def create_fiducias_grid(df, grupo_estrato="Todos"):
             lambda x: str(x).split(' - ')[1] if ' - ' in str(x) else str(x)
         )
     
-    # Separar datos por estrato
-    df_123 = df[df['es_123'] == True].copy()
-    df_456 = df[df['es_123'] == False].copy()
+    # Separar datos por estrato (solo lectura: sin copias)
+    df_123 = df[df['es_123'] == True]
+    df_456 = df[df['es_123'] == False]
     
     # Filtrar según selección
     if grupo_estrato == "Estratos 1, 2 y 3":
-        df_filtrado = df_123.copy()
+        df_filtrado = df_123
         df_456 = pd.DataFrame()  # Vacío
     elif grupo_estrato == "Estratos 4, 5 y 6":
-        df_filtrado = df_456.copy()
+        df_filtrado = df_456
         df_123 = pd.DataFrame()  # Vacío
     else:
-        df_filtrado = df.copy()
+        df_filtrado = df
     
     # Obtener todas las comunas únicas del df filtrado
     all_comunas = sorted(df_filtrado['Comuna Base'].unique()) if not df_filtrado.empty else []
@@ -332,580 +594,53 @@ def create_fiducias_grid(df, grupo_estrato="Todos"):
         return
     
     # Ordenar comunas por número usando la función importada
-    comunas_ordenadas = []
-    for comuna in all_comunas:
-        numero = get_comuna_numero(comuna)
-        comunas_ordenadas.append((int(numero) if numero.isdigit() else 99, comuna))
-    
-    comunas_ordenadas.sort(key=lambda x: x[0])
-    comunas_finales = [comuna for _, comuna in comunas_ordenadas]
-    
-    # Preparar datos agrupados por comuna - ASEGURAR VALORES ENTEROS
-    comunas_data = {}
-    
-    for comuna in comunas_finales:
-        # Datos para Estratos 1-3
-        df_comuna_123 = df_123[df_123['Comuna Base'] == comuna]
-        if not df_comuna_123.empty:
-            # Sumar y convertir a enteros
-            presupuesto_123 = int(df_comuna_123['presupuesto_comuna'].sum())
-            restante_123 = int(df_comuna_123['restante_presupuesto_comuna'].sum())
-            usuarios_123 = int(df_comuna_123['numero_usuarios_comuna'].sum())
-            
-            resumen_123 = {
-                'presupuesto_comuna': presupuesto_123,
-                'restante_presupuesto_comuna': restante_123,
-                'numero_usuarios_comuna': usuarios_123
-            }
-            fiducias_123 = df_comuna_123[['idfiducia', 'presupuesto_comuna', 'restante_presupuesto_comuna']].copy()
-        else:
-            resumen_123 = None
-            fiducias_123 = pd.DataFrame()
-        
-        # Datos para Estratos 4-6
-        df_comuna_456 = df_456[df_456['Comuna Base'] == comuna]
-        if not df_comuna_456.empty:
-            # Sumar y convertir a enteros
-            presupuesto_456 = int(df_comuna_456['presupuesto_comuna'].sum())
-            restante_456 = int(df_comuna_456['restante_presupuesto_comuna'].sum())
-            usuarios_456 = int(df_comuna_456['numero_usuarios_comuna'].sum())
-            
-            resumen_456 = {
-                'presupuesto_comuna': presupuesto_456,
-                'restante_presupuesto_comuna': restante_456,
-                'numero_usuarios_comuna': usuarios_456
-            }
-            fiducias_456 = df_comuna_456[['idfiducia', 'presupuesto_comuna', 'restante_presupuesto_comuna']].copy()
-        else:
-            resumen_456 = None
-            fiducias_456 = pd.DataFrame()
-        
-        comunas_data[comuna] = {
-            'resumen_123': resumen_123,
-            'fiducias_123': fiducias_123,
-            'resumen_456': resumen_456,
-            'fiducias_456': fiducias_456
-        }
-    
-    # DEFINIR EL CSS DENTRO DE LA FUNCIÓN - CORREGIDO
-    fiducias_css = '''
-    <style>
-    /* RESET */
-    .fiducias-container * {
-        margin: 0;
-        padding: 0;
-        box-sizing: border-box;
-    }
-    
-    /* Contenedor principal */
-    .comunas-sections {
-        display: flex;
-        flex-direction: column;
-        gap: 40px;
-        padding: 20px 10px;
-    }
-    
-    /* Sección de comuna */
-    .comuna-section {
-        background: white;
-        border-radius: 20px;
-        padding: 0;
-        box-shadow: 0 8px 25px rgba(0, 0, 0, 0.1);
-        border: 3px solid #e0e0e0;
-        overflow: hidden;
-    }
-    
-    /* Encabezado de comuna */
-    .comuna-section-header {
-        background: linear-gradient(135deg, #1a73e8 0%, #0d47a1 100%);
-        padding: 15px 30px;
-        display: flex;
-        align-items: center;
-        gap: 20px;
-    }
-    
-    .comuna-section-numero {
-        font-size: 40px !important;
-        font-weight: 900 !important;
-        color: white !important;
-        background: rgba(255, 255, 255, 0.2);
-        width: 60px;
-        height: 60px;
-        border-radius: 50%;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        text-shadow: 1px 1px 3px rgba(0, 0, 0, 0.3);
-        font-family: 'Inter', sans-serif !important;
-    }
-    
-    .comuna-section-nombre {
-        font-size: 32px !important;
-        font-weight: 800 !important;
-        color: white !important;
-        text-transform: uppercase;
-        letter-spacing: 0.5px;
-        text-shadow: 1px 1px 3px rgba(0, 0, 0, 0.3);
-        flex-grow: 1;
-        font-family: 'Inter', sans-serif !important;
-    }
-    
-    /* Fila por estrato */
-    .estrato-row {
-        display: grid;
-        grid-template-columns: 1fr 1fr;
-        gap: 0;
-        border-top: 3px solid #f0f0f0;
-    }
-    
-    /* Tarjeta de resumen */
-    .estrato-resumen-card {
-        padding: 25px;
-        height: 100%;
-        display: flex;
-        flex-direction: column;
-        min-height: 280px;
-        border-right: 3px solid #f0f0f0;
-        background: #f8f9fa;
-    }
-    
-    /* Estados de urgencia para resumen */
-    .estrato-resumen-card.urgent {
-        border-left: 5px solid #d93025;
-        background: linear-gradient(135deg, #ffffff 0%, #fce8e6 100%);
-    }
-    
-    .estrato-resumen-card.warning {
-        border-left: 5px solid #f9ab00;
-        background: linear-gradient(135deg, #ffffff 0%, #fef7e0 100%);
-    }
-    
-    .estrato-resumen-card.ok {
-        border-left: 5px solid #34a853;
-        background: linear-gradient(135deg, #ffffff 0%, #e6f4ea 100%);
-    }
-    
-    .estrato-resumen-card.available {
-        border-left: 5px solid #0b8043;
-        background: linear-gradient(135deg, #ffffff 0%, #d5e8d9 100%);
-    }
-    
-    /* Estado "NO APLICA" */
-    .estrato-resumen-card.no-data {
-        background: #f8f9fa;
-        display: flex;
-        flex-direction: column;
-        justify-content: center;
-        align-items: center;
-        border-left: 5px solid #80868b;
-    }
-    
-    .no-data-state {
-        text-align: center;
-        padding: 20px;
-    }
-    
-    .no-data-icon {
-        font-size: 48px;
-        margin-bottom: 15px;
-        opacity: 0.5;
-        color: #80868b;
-    }
-    
-    .no-data-title {
-        font-size: 22px !important;
-        font-weight: 800 !important;
-        color: #80868b !important;
-        margin-bottom: 10px;
-        text-transform: uppercase;
-    }
-    
-    .no-data-text {
-        font-size: 16px;
-        color: #9aa0a6;
-        max-width: 250px;
-        margin: 0 auto;
-    }
-    
-    .estrato-resumen-header {
-        display: flex;
-        justify-content: space-between;
-        align-items: center;
-        margin-bottom: 20px;
-    }
-    
-    .estrato-resumen-title {
-        font-size: 24px !important;
-        font-weight: 800 !important;
-        color: #202124 !important;
-        font-family: 'Inter', sans-serif !important;
-    }
-    
-    .estrato-resumen-badge {
-        padding: 6px 12px;
-        border-radius: 15px;
-        font-size: 12px !important;
-        font-weight: 700 !important;
-        text-transform: uppercase;
-        letter-spacing: 0.5px;
-        font-family: 'Inter', sans-serif !important;
-    }
-    
-    .estrato-resumen-badge.estrato-123 {
-        background-color: #e8f0fe;
-        color: #1a73e8 !important;
-        border: 2px solid #1a73e8;
-    }
-    
-    .estrato-resumen-badge.estrato-456 {
-        background-color: #e6f4ea;
-        color: #0d652d !important;
-        border: 2px solid #0d652d;
-    }
-    
-    .estrato-resumen-status {
-        padding: 10px;
-        border-radius: 10px;
-        font-size: 18px !important;
-        font-weight: 800 !important;
-        text-align: center;
-        margin: 15px 0;
-        text-transform: uppercase;
-        letter-spacing: 1px;
-        font-family: 'Inter', sans-serif !important;
-    }
-    
-    .estrato-resumen-status.urgent {
-        background-color: #d93025;
-        color: white !important;
-    }
-    
-    .estrato-resumen-status.warning {
-        background-color: #f9ab00;
-        color: #202124 !important;
-    }
-    
-    .estrato-resumen-status.ok {
-        background-color: #34a853;
-        color: white !important;
-    }
-    
-    .estrato-resumen-status.available {
-        background-color: #0b8043;
-        color: white !important;
-    }
-    
-    .estrato-resumen-metrics {
-        flex-grow: 1;
-        display: flex;
-        flex-direction: column;
-        justify-content: center;
-    }
-    
-    .estrato-metric-row {
-        display: flex;
-        justify-content: space-between;
-        align-items: center;
-        margin-bottom: 12px;
-    }
-    
-    .estrato-metric-label {
-        font-size: 16px !important;
-        color: #5f6368;
-        font-weight: 600;
-        font-family: 'Roboto', sans-serif !important;
-    }
-    
-    .estrato-metric-value {
-        font-size: 18px !important;
-        font-weight: 700 !important;
-        color: #202124;
-        font-family: 'Inter', sans-serif !important;
-        text-align: right;
-        min-width: 150px;
-    }
-    
-    .estrato-resumen-progress {
-        margin-top: 20px;
-    }
-    
-    .estrato-resumen-progress-info {
-        display: flex;
-        justify-content: space-between;
-        align-items: center;
-        margin-bottom: 8px;
-    }
-    
-    .estrato-resumen-progress-label {
-        font-size: 14px !important;
-        color: #5f6368;
-        font-weight: 600;
-        font-family: 'Roboto', sans-serif !important;
-    }
-    
-    .estrato-resumen-progress-value {
-        font-size: 20px !important;
-        font-weight: 900 !important;
-        font-family: 'Inter', sans-serif !important;
-    }
-    
-    .estrato-resumen-progress-bar {
-        height: 10px;
-        background-color: #eaedf2;
-        border-radius: 5px;
-        overflow: hidden;
-        border: 1px solid #dadce0;
-    }
-    
-    .estrato-resumen-progress-fill {
-        height: 100%;
-        border-radius: 5px;
-        transition: width 1s ease;
-    }
-    
-    /* Tarjeta de fiducias */
-    .fiducias-card {
-        padding: 25px;
-        height: 100%;
-        display: flex;
-        flex-direction: column;
-        min-height: 280px;
-        background: white;
-        overflow-y: auto;
-    }
-    
-    .fiducias-card.no-data {
-        display: flex;
-        flex-direction: column;
-        justify-content: center;
-        align-items: center;
-        background: #f8f9fa;
-        border-left: 5px solid #80868b;
-    }
-    
-    .fiducias-header {
-        display: flex;
-        justify-content: space-between;
-        align-items: center;
-        margin-bottom: 20px;
-        padding-bottom: 15px;
-        border-bottom: 2px solid #f0f0f0;
-    }
-    
-    .fiducias-header.no-data {
-        justify-content: center;
-        border-bottom: none;
-    }
-    
-    .fiducias-title {
-        font-size: 20px !important;
-        font-weight: 800 !important;
-        color: #1a73e8 !important;
-        font-family: 'Inter', sans-serif !important;
-    }
-    
-    .fiducias-title.no-data {
-        color: #80868b !important;
-    }
-    
-    .fiducias-count {
-        font-size: 14px !important;
-        font-weight: 600 !important;
-        color: #5f6368;
-        background: #f0f2f6;
-        padding: 4px 10px;
-        border-radius: 12px;
-        font-family: 'Roboto', sans-serif !important;
-    }
-    
-    .fiducias-list {
-        flex-grow: 1;
-        overflow-y: auto;
-        padding-right: 5px;
-    }
-    
-    .fiducia-item {
-        background: #f8f9fa;
-        border-radius: 10px;
-        padding: 15px;
-        margin-bottom: 12px;
-        border: 1px solid #e0e0e0;
-        transition: all 0.3s ease;
-    }
-    
-    .fiducia-item:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 4px 8px rgba(0, 0, 0, 0.1);
-        border-color: #1a73e8;
-    }
-    
-    .fiducia-header {
-        display: flex;
-        justify-content: space-between;
-        align-items: center;
-        margin-bottom: 10px;
-    }
-    
-    .fiducia-id {
-        font-size: 16px !important;
-        font-weight: 700 !important;
-        color: #202124;
-        font-family: 'Inter', sans-serif !important;
-    }
-    
-    .fiducia-porcentaje {
-        font-size: 14px !important;
-        font-weight: 700 !important;
-        font-family: 'Inter', sans-serif !important;
-    }
-    
-    .fiducias-metrics {
-        display: grid;
-        grid-template-columns: 1fr 1fr;
-        gap: 15px;
-        margin-bottom: 10px;
-    }
-    
-    .fiducia-metric {
-        text-align: center;
-    }
-    
-    .fiducia-metric-label {
-        font-size: 12px;
-        color: #5f6368;
-        font-weight: 500;
-        margin-bottom: 4px;
-        font-family: 'Roboto', sans-serif !important;
-    }
-    
-    .fiducia-metric-value {
-        font-size: 14px;
-        font-weight: 700;
-        color: #202124;
-        font-family: 'Inter', sans-serif !important;
-        word-break: break-word;
-    }
-    
-    .fiducia-metric-value.available {
-        color: #34a853;
-    }
-    
-    .fiducias-progress {
-        margin-top: 10px;
-    }
-    
-    .fiducia-progress-bar {
-        height: 6px;
-        background-color: #eaedf2;
-        border-radius: 3px;
-        overflow: hidden;
-    }
-    
-    .fiducia-progress-fill {
-        height: 100%;
-        border-radius: 3px;
-        transition: width 1s ease;
-    }
-    
-    /* Responsive */
-    @media (max-width: 1200px) {
-        .comuna-section-nombre {
-            font-size: 28px !important;
-        }
-        
-        .comuna-section-numero {
-            font-size: 36px !important;
-            width: 55px;
-            height: 55px;
-        }
-        
-        .estrato-resumen-title {
-            font-size: 20px !important;
-        }
-        
-        .fiducias-title {
-            font-size: 18px !important;
-        }
-        
-        .estrato-metric-value {
-            font-size: 16px !important;
-            min-width: 120px;
-        }
-    }
-    
-    @media (max-width: 768px) {
-        .estrato-row {
-            grid-template-columns: 1fr;
-        }
-        
-        .estrato-resumen-card {
-            border-right: none;
-            border-bottom: 3px solid #f0f0f0;
-        }
-        
-        .estrato-metric-value {
-            min-width: 100px;
-        }
-    }
-    </style>
-    '''
-    
-    # Generar HTML
-    html_content = f'''
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;600;700;800&family=Roboto:wght@400;500;700;900&display=swap" rel="stylesheet">
-        {fiducias_css}
-    </head>
-    <body>
-        <div class="fiducias-container">
-            <div class="comunas-sections">
-    '''
-    
-    # Generar secciones para cada comuna
-    for comuna in comunas_finales:
-        data = comunas_data[comuna]
-        html_content += create_comuna_section(
-            comuna_nombre=comuna,
-            resumen_123=data['resumen_123'],
-            fiducias_123=data['fiducias_123'],
-            resumen_456=data['resumen_456'],
-            fiducias_456=data['fiducias_456']
-        )
-    
-    html_content += '''
-            </div>
-        </div>
-    </body>
-    </html>
-    '''
+    comunas_finales = ordenar_comunas(all_comunas)
+    
+    if cube is None:
+        cube = build_aggregate_cube(df)
+    
+    # Datos del grid: se reutilizan si los datos y el filtro no cambiaron
+    payload = _get_cached_grid_payload(cache_key)
+    if payload is None:
+        payload = build_fiducias_payload(comunas_finales, partition_fiducias(df_filtrado), cube)
+        _store_grid_payload(cache_key, payload)
+    
+    # Estadísticas desde el cubo (todo el periodo o la comuna), según el estrato mostrado
+    totales, por_estrato = cube_totals(cube, comuna_filtro)
+    vacio = {'fiducias': 0, 'presupuesto_comuna': 0, 'numero_usuarios_comuna': 0}
+    estrato_123 = por_estrato[True] if not df_123.empty and por_estrato[True] else vacio
+    estrato_456 = por_estrato[False] if not df_456.empty and por_estrato[False] else vacio
+    if grupo_estrato == "Estratos 1, 2 y 3":
+        totales = estrato_123
+    elif grupo_estrato == "Estratos 4, 5 y 6":
+        totales = estrato_456
+    totales = totales or vacio
     
     # Mostrar estadísticas - VALORES ENTEROS
     col1, col2, col3 = st.columns(3)
     with col1:
-        total_fiducias = len(df_filtrado['idfiducia'].unique()) if 'idfiducia' in df_filtrado.columns else 0
-        fiducias_123_count = len(df_123['idfiducia'].unique()) if 'idfiducia' in df_123.columns else 0
-        fiducias_456_count = len(df_456['idfiducia'].unique()) if 'idfiducia' in df_456.columns else 0
         st.metric(
             label="FIDUCIAS TOTALES",
-            value=total_fiducias,
-            delta=f"1-3: {fiducias_123_count} | 4-6: {fiducias_456_count}"
+            value=totales['fiducias'],
+            delta=f"1-3: {estrato_123['fiducias']} | 4-6: {estrato_456['fiducias']}"
         )
     
     with col2:
-        total_presupuesto = int(df_filtrado['presupuesto_comuna'].sum()) if not df_filtrado.empty else 0
-        st.metric("PRESUPUESTO TOTAL", format_currency_complete(total_presupuesto))
+        st.metric("PRESUPUESTO TOTAL", format_currency_complete(totales['presupuesto_comuna']))
     
     with col3:
-        total_usuarios = int(df_filtrado['numero_usuarios_comuna'].sum()) if not df_filtrado.empty else 0
-        st.metric("LEGALIZADOS", f"{total_usuarios:,}")
+        st.metric("LEGALIZADOS", f"{totales['numero_usuarios_comuna']:,}")
     
-    # Mostrar el grid
+    # Mostrar el grid: el componente queda montado entre refrescos (misma key) y
+    # solo recibe los números; actualiza en el navegador los nodos que cambiaron
     st.markdown("---")
-    components.html(html_content, height=1200, scrolling=True)
+    _grid_component()(
+        payload=payload,
+        assets=asset_urls(*GRID_STYLESHEETS),
+        height=1200,
+        key=FIDUCIAS_GRID_KEY,
+        default=None
+    )
     
     # Leyenda
     with st.expander("📋 LEYENDA - ESTADOS DE UTILIZACIÓN", expanded=True):
@@ -928,6 +663,6 @@ def create_fiducias_grid(df, grupo_estrato="Todos"):
                 </div>
                 """, unsafe_allow_html=True)
 
-def create_tv_cards_grid(df, grupo_estrato="Todos"):
+def create_tv_cards_grid(df, grupo_estrato="Todos", cache_key=None, cube=None, comuna_filtro=None):
     """Función principal que llama a la nueva estructura"""
-    return create_fiducias_grid(df, grupo_estrato)
\ No newline at end of file
+    return create_fiducias_grid(df, grupo_estrato, cache_key=cache_key, cube=cube, comuna_filtro=comuna_filtro)
\ No newline at end of file
@@ -0,0 +1,305 @@
+// app/components/fiducias_grid/grid.js - ACTUALIZACIÓN DEL GRID DE FIDUCIAS SIN RECARGAR EL IFRAME
+//
+// Componente bidireccional de Streamlit (protocolo postMessage, sin dependencias):
+//   Streamlit -> grid: "streamlit:render" con args.payload (solo números), args.assets y args.height
+//   grid -> Streamlit: componentReady, setFrameHeight y setComponentValue (clic en una comuna)
+//
+// El DOM se construye una vez desde las plantillas de index.html. En cada refresco se
+// comparan los valores y solo se tocan los nodos que cambiaron; las secciones y las
+// fiducias se identifican por nombre de comuna e id de fiducia.
+(function () {
+    "use strict";
+
+    // Mismos textos que create_comuna_section (línea 1: estratos 1-3, línea 2: 4-6)
+    var ESTRATOS = [
+        { texto: "ESTRATOS 1-3", clase: "estrato-123" },
+        { texto: "ESTRATOS 4-6", clase: "estrato-456" }
+    ];
+
+    var contenedor = document.querySelector(".comunas-sections");
+    var secciones = new Map();  // nombre de comuna -> estado de la sección
+    var alto = null;
+
+    // ----------------------------------------------------------------------------
+    // Protocolo de componentes de Streamlit
+    // ----------------------------------------------------------------------------
+    function enviar(tipo, datos) {
+        var mensaje = Object.assign({ isStreamlitMessage: true, type: tipo }, datos || {});
+        window.parent.postMessage(mensaje, "*");
+    }
+
+    window.addEventListener("message", function (evento) {
+        var datos = evento.data;
+        if (!datos || datos.type !== "streamlit:render") {
+            return;
+        }
+        var args = datos.args || {};
+        if (args.height && args.height !== alto) {
+            alto = args.height;
+            enviar("streamlit:setFrameHeight", { height: alto });
+        }
+        if (args.assets) {
+            hojasDeEstilo(args.assets);
+        }
+        if (args.payload) {
+            render(args.payload);
+        }
+    });
+
+    // ----------------------------------------------------------------------------
+    // CSS y fuentes: /assets/ con hash (caché de un año) o, si esas rutas no están
+    // montadas (streamlit run directo), el CSS en línea en un <style>
+    // ----------------------------------------------------------------------------
+    function hojasDeEstilo(assets) {
+        var vigentes = assets.hrefs || [];
+        // Quitar las versiones anteriores (cambió el contenido) y agregar solo las nuevas
+        document.querySelectorAll("link[data-asset]").forEach(function (link) {
+            if (vigentes.indexOf(link.getAttribute("href")) === -1) {
+                link.remove();
+            }
+        });
+        vigentes.forEach(function (href) {
+            if (!document.querySelector('link[data-asset][href="' + href + '"]')) {
+                var link = document.createElement("link");
+                link.rel = "stylesheet";
+                link.href = href;
+                link.setAttribute("data-asset", "");
+                document.head.appendChild(link);
+            }
+        });
+
+        var css = (assets.inline || []).join("\n");
+        var estilo = document.querySelector("style[data-asset]");
+        if (!css) {
+            if (estilo) {
+                estilo.remove();
+            }
+            return;
+        }
+        if (!estilo) {
+            estilo = document.createElement("style");
+            estilo.setAttribute("data-asset", "");
+            document.head.appendChild(estilo);
+        }
+        if (estilo.textContent !== css) {
+            estilo.textContent = css;
+        }
+    }
+
+    // ----------------------------------------------------------------------------
+    // Formato (igual que format_currency_complete / get_status_color_tv / get_urgency_status)
+    // ----------------------------------------------------------------------------
+    function miles(valor) {
+        return String(Math.trunc(valor)).replace(/\B(?=(\d{3})+(?!\d))/g, ",");
+    }
+
+    function moneda(valor) {
+        return "$ " + miles(valor);
+    }
+
+    function porcentajeUsado(presupuesto, restante) {
+        return presupuesto > 0 ? (presupuesto - restante) / presupuesto * 100 : 0;
+    }
+
+    function colorEstado(porcentaje) {
+        if (porcentaje >= 90) { return "#ea4335"; }
+        if (porcentaje >= 70) { return "#f9ab00"; }
+        if (porcentaje >= 40) { return "#34a853"; }
+        return "#0b8043";
+    }
+
+    function urgencia(porcentaje) {
+        if (porcentaje >= 90) { return ["urgent", "POTENCIALMENTE AGOTADO"]; }
+        if (porcentaje >= 70) { return ["warning", "MODERADO"]; }
+        if (porcentaje >= 40) { return ["ok", "DISPONIBLE"]; }
+        return ["available", "MUY DISPONIBLE"];
+    }
+
+    // ----------------------------------------------------------------------------
+    // Utilidades del DOM: solo escriben si el valor cambió
+    // ----------------------------------------------------------------------------
+    function clonar(id) {
+        var nodo = document.getElementById(id).content.firstElementChild.cloneNode(true);
+        var campos = {};
+        nodo.querySelectorAll("[data-campo]").forEach(function (el) {
+            campos[el.getAttribute("data-campo")] = el;
+        });
+        return { el: nodo, campos: campos };
+    }
+
+    function texto(el, valor) {
+        if (el.textContent !== valor) {
+            el.textContent = valor;
+        }
+    }
+
+    function estilo(el, propiedad, valor) {
+        // Se compara con el último valor escrito (el navegador normaliza los colores al leerlos)
+        var clave = "_" + propiedad;
+        if (el[clave] !== valor) {
+            el.style[propiedad] = valor;
+            el[clave] = valor;
+        }
+    }
+
+    function clase(el, valor) {
+        if (el.className !== valor) {
+            el.className = valor;
+        }
+    }
+
+    // ----------------------------------------------------------------------------
+    // Tarjetas
+    // ----------------------------------------------------------------------------
+    function actualizarResumen(tarjeta, resumen) {
+        var presupuesto = resumen[0], restante = resumen[1], usuarios = resumen[2];
+        var porcentaje = porcentajeUsado(presupuesto, restante);
+        var estado = urgencia(porcentaje);
+        var color = colorEstado(porcentaje);
+        var c = tarjeta.campos;
+
+        clase(tarjeta.el, "estrato-resumen-card " + estado[0]);
+        clase(c.status, "estrato-resumen-status " + estado[0]);
+        texto(c.urgencia, estado[1]);
+        texto(c.presupuesto, moneda(presupuesto));
+        texto(c.restante, moneda(restante));
+        texto(c.usuarios, miles(usuarios));
+        texto(c.porcentaje, porcentaje.toFixed(1) + "%");
+        estilo(c.porcentaje, "color", color);
+        estilo(c.barra, "width", porcentaje + "%");
+        estilo(c.barra, "background", color);
+    }
+
+    function actualizarFiducia(item, fiducia) {
+        var presupuesto = fiducia[1], restante = fiducia[2];
+        var porcentaje = porcentajeUsado(presupuesto, restante);
+        var color = colorEstado(porcentaje);
+        var c = item.campos;
+
+        texto(c.id, "Fiducia " + fiducia[0]);
+        texto(c.porcentaje, porcentaje.toFixed(1) + "%");
+        estilo(c.porcentaje, "color", color);
+        texto(c.presupuesto, moneda(presupuesto));
+        texto(c.restante, moneda(restante));
+        estilo(c.barra, "width", porcentaje + "%");
+        estilo(c.barra, "background", color);
+    }
+
+    function actualizarLista(tarjeta, fiducias) {
+        // Fiducias por id: se crean las nuevas, se quitan las que ya no vienen y se
+        // respeta el orden recibido (mayor a menor presupuesto). Un id repetido en el
+        // mismo estrato se distingue por su número de aparición.
+        var vistas = new Set();
+        var apariciones = {};
+        var lista = tarjeta.campos.lista;
+        fiducias.forEach(function (fiducia, posicion) {
+            apariciones[fiducia[0]] = (apariciones[fiducia[0]] || 0) + 1;
+            var id = fiducia[0] + "#" + apariciones[fiducia[0]];
+            var item = tarjeta.items.get(id);
+            if (!item) {
+                item = clonar("tpl-fiducia");
+                tarjeta.items.set(id, item);
+            }
+            vistas.add(id);
+            actualizarFiducia(item, fiducia);
+            if (lista.children[posicion] !== item.el) {
+                lista.insertBefore(item.el, lista.children[posicion] || null);
+            }
+        });
+        tarjeta.items.forEach(function (item, id) {
+            if (!vistas.has(id)) {
+                item.el.remove();
+                tarjeta.items.delete(id);
+            }
+        });
+        texto(tarjeta.campos.cantidad, fiducias.length + " fiducia(s)");
+    }
+
+    function construirFila(fila, meta, conDatos) {
+        // Cambia de "con datos" a "no aplica" (o al revés): se reemplazan las dos tarjetas
+        var corto = meta.texto.replace("ESTRATOS ", "");
+        var resumen = clonar(conDatos ? "tpl-resumen" : "tpl-resumen-vacio");
+        var fiducias = clonar(conDatos ? "tpl-fiducias" : "tpl-fiducias-vacio");
+
+        resumen.campos.estrato.textContent = meta.texto;
+        resumen.campos.badge.className = "estrato-resumen-badge " + meta.clase;
+        if (conDatos) {
+            fiducias.campos.titulo.textContent = "📦 FIDUCIAS " + meta.texto;
+            fiducias.items = new Map();
+        } else {
+            resumen.campos.texto.textContent = "Esta comuna no tiene " + corto;
+            fiducias.campos.titulo.textContent = "FIDUCIAS " + meta.texto;
+            fiducias.campos.texto.textContent = "Esta comuna no tiene " + corto;
+        }
+
+        while (fila.el.firstChild) {
+            fila.el.removeChild(fila.el.firstChild);
+        }
+        fila.el.appendChild(resumen.el);
+        fila.el.appendChild(fiducias.el);
+        fila.conDatos = conDatos;
+        fila.resumen = resumen;
+        fila.fiducias = fiducias;
+    }
+
+    function actualizarFila(fila, meta, estrato) {
+        // Mismo criterio que create_comuna_estrato_row: resumen y al menos una fiducia
+        var conDatos = estrato.resumen !== null && estrato.fiducias.length > 0;
+        if (fila.conDatos !== conDatos) {
+            construirFila(fila, meta, conDatos);
+        }
+        if (conDatos) {
+            actualizarResumen(fila.resumen, estrato.resumen);
+            actualizarLista(fila.fiducias, estrato.fiducias);
+        }
+    }
+
+    // ----------------------------------------------------------------------------
+    // Secciones por comuna
+    // ----------------------------------------------------------------------------
+    function crearSeccion(nombre) {
+        var seccion = clonar("tpl-comuna");
+        seccion.filas = Array.prototype.map.call(
+            seccion.el.querySelectorAll(".estrato-row"),
+            function (el) { return { el: el, conDatos: null }; }
+        );
+        seccion.el.querySelector(".comuna-section-header").addEventListener("click", function () {
+            // La marca de tiempo distingue dos clics seguidos sobre la misma comuna
+            enviar("streamlit:setComponentValue", {
+                value: { comuna: nombre, clic: Date.now() },
+                dataType: "json"
+            });
+        });
+        return seccion;
+    }
+
+    function render(payload) {
+        var vistas = new Set();
+        payload.comunas.forEach(function (comuna, posicion) {
+            var seccion = secciones.get(comuna.nombre);
+            if (!seccion) {
+                seccion = crearSeccion(comuna.nombre);
+                secciones.set(comuna.nombre, seccion);
+            }
+            vistas.add(comuna.nombre);
+
+            texto(seccion.campos.numero, comuna.numero);
+            texto(seccion.campos.nombre, comuna.nombre);
+            comuna.estratos.forEach(function (estrato, i) {
+                actualizarFila(seccion.filas[i], ESTRATOS[i], estrato);
+            });
+
+            if (contenedor.children[posicion] !== seccion.el) {
+                contenedor.insertBefore(seccion.el, contenedor.children[posicion] || null);
+            }
+        });
+        secciones.forEach(function (seccion, nombre) {
+            if (!vistas.has(nombre)) {
+                seccion.el.remove();
+                secciones.delete(nombre);
+            }
+        });
+    }
+
+    enviar("streamlit:componentReady", { apiVersion: 1 });
+})();
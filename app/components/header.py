@@ -1,6 +1,9 @@
 # app/components/header.py - VERSIÓN SIMPLIFICADA
 import streamlit as st
 from datetime import datetime
+from html import escape
+from app.cache import data_cache
+from app.snapshot import refresher
 
 def render_header():
     """Renderizar el encabezado del dashboard - SIN TÍTULO EN BLANCO"""
@@ -30,43 +33,88 @@ def render_header():
     </div>
     """, unsafe_allow_html=True)
 
-def render_control_bar(last_refresh, auto_refresh):
-    """Renderizar barra de control superior - SIMPLIFICADA"""
+def render_control_bar(last_refresh, auto_refresh, refresh_interval=30):
+    """
+    Renderizar barra de control superior - SIMPLIFICADA.
+    Con auto-refresh, la fecha se actualiza sola cada `refresh_interval`
+    segundos sin volver a ejecutar el resto de la página.
+    """
     col1, col2, col3 = st.columns([2, 1, 1])
     
-    with col1:
-        # FECHA DE ACTUALIZACIÓN CON MEJOR VISIBILIDAD
-        last_update = last_refresh.strftime('%d/%m/%Y %I:%M %p')
-        st.markdown(f"""
-        <div style="background: #f8f9fa; 
-                   padding: 12px 20px; 
-                   border-radius: 12px; 
-                   border: 2px solid #1a73e8;
-                   box-shadow: 0 3px 8px rgba(26, 115, 232, 0.15);">
-            <div style="color: #1a73e8; font-weight: 700; font-size: 14px; 
-                       text-align: center; margin-bottom: 5px;">
-                📅 ÚLTIMA ACTUALIZACIÓN
-            </div>
-            <div style="color: #202124; font-weight: 900; font-size: 18px;
-                       text-align: center;">
-                {last_update}
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
-    
     with col2:
         # Checkbox de auto-refresh actualizado
         auto_refresh = st.checkbox(
             "🔄 **AUTO-REFRESH**",
             value=auto_refresh,
-            help="Actualizar automáticamente cada 30 segundos"
+            help=f"Actualizar automáticamente cada {refresh_interval} segundos"
         )
     
     with col3:
         # Botón de actualizar manual
         if st.button("🔄 **ACTUALIZAR**", use_container_width=True, type="secondary"):
             st.session_state.last_refresh = datetime.now()
-            st.cache_data.clear()
+            # Invalidar solo lo cacheado del presupuesto del periodo (no toda la caché del servidor)
+            data_cache.invalidate(refresher.store.table_name, refresher.store.period)
+            refresher.request_refresh()
             st.rerun()
     
-    return auto_refresh  # Eliminamos el retorno de current_page
\ No newline at end of file
+    with col1:
+        # FECHA DE ACTUALIZACIÓN CON MEJOR VISIBILIDAD (fragmento propio)
+        render_last_update = st.fragment(run_every=refresh_interval if auto_refresh else None)(
+            _render_last_update
+        )
+        render_last_update(last_refresh)
+    
+    return auto_refresh  # Eliminamos el retorno de current_page
+
+def _render_last_update(last_refresh):
+    """Recuadro con la hora de la última consulta del refrescador"""
+    last_update = (refresher.last_check or last_refresh).strftime('%d/%m/%Y %I:%M %p')
+    st.markdown(f"""
+    <div style="background: #f8f9fa; 
+               padding: 12px 20px; 
+               border-radius: 12px; 
+               border: 2px solid #1a73e8;
+               box-shadow: 0 3px 8px rgba(26, 115, 232, 0.15);">
+        <div style="color: #1a73e8; font-weight: 700; font-size: 14px; 
+                   text-align: center; margin-bottom: 5px;">
+            📅 ÚLTIMA ACTUALIZACIÓN
+        </div>
+        <div style="color: #202124; font-weight: 900; font-size: 18px;
+                   text-align: center;">
+            {last_update}
+        </div>
+    </div>
+    """, unsafe_allow_html=True)
+
+def render_staleness_badge(snapshot, last_check, last_error):
+    """Avisar cuando se muestran datos guardados en disco o sin conexión a la BD"""
+    if snapshot is None:
+        return
+    
+    if last_error:
+        referencia = last_check or snapshot.published_at
+        titulo = "⚠️ SIN CONEXIÓN A LA BASE DE DATOS"
+        detalle = (
+            f"Mostrando los últimos datos disponibles ({referencia.strftime('%d/%m/%Y %I:%M %p')})"
+            f"<br><span style=\"font-weight: 400;\">{escape(str(last_error))}</span>"
+        )
+        color, fondo = "#d93025", "#fce8e6"
+    elif snapshot.source == 'disco' and last_check is None:
+        titulo = "⏳ ACTUALIZANDO DATOS"
+        detalle = f"Mostrando datos guardados del {snapshot.published_at.strftime('%d/%m/%Y %I:%M %p')}"
+        color, fondo = "#f9ab00", "#fef7e0"
+    else:
+        return
+    
+    st.markdown(f"""
+    <div style="background: {fondo}; 
+               padding: 10px 20px; 
+               border-radius: 12px; 
+               border: 2px solid {color};
+               margin: 10px 0 20px 0;
+               text-align: center;">
+        <div style="color: {color}; font-weight: 900; font-size: 16px;">{titulo}</div>
+        <div style="color: #202124; font-weight: 600; font-size: 14px;">{detalle}</div>
+    </div>
+    """, unsafe_allow_html=True)
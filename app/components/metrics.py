@@ -4,6 +4,7 @@ from app.utils import format_currency
 
 # app/components/metrics.py - CORREGIDO
 import streamlit as st
+from app.aggregates import build_aggregate_cube, cube_totals
 from app.utils import format_currency
 
 def render_global_metrics(metrics):
@@ -73,15 +74,21 @@ def render_global_metrics(metrics):
     st.markdown(html_content, unsafe_allow_html=True)
 
 # Mantener la función de comuna si la usas
-def render_comuna_metrics(df_comuna):
-    """Renderizar métricas específicas de una comuna"""
+def render_comuna_metrics(df_comuna, totales=None):
+    """
+    Renderizar métricas específicas de una comuna
+    `totales` es la fila de la comuna en el cubo de agregados (si no, se calcula)
+    """
     if df_comuna.empty:
         return
     
-    presupuesto = df_comuna['presupuesto_comuna'].sum()
-    restante = df_comuna['restante_presupuesto_comuna'].sum()
-    usuarios = df_comuna['numero_usuarios_comuna'].sum()
-    fiducias = df_comuna['idfiducia'].nunique()
+    if totales is None:
+        totales, _ = cube_totals(build_aggregate_cube(df_comuna))
+    
+    presupuesto = totales['presupuesto_comuna']
+    restante = totales['restante_presupuesto_comuna']
+    usuarios = totales['numero_usuarios_comuna']
+    fiducias = totales['fiducias']
     
     col1, col2, col3, col4 = st.columns(4)
     
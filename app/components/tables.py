@@ -1,41 +1,35 @@
 # app/components/tables.py
 import pandas as pd
+from app.aggregates import build_aggregate_cube
 from app.utils import format_currency
 
-def create_summary_table(df, grupo_estrato="Todos"):
-    """Crear tabla de resumen similar a Power BI"""
+def create_summary_table(df, grupo_estrato="Todos", cube=None):
+    """
+    Crear tabla de resumen similar a Power BI
+    Las sumas por comuna se leen del cubo de agregados (se calcula si no se pasa)
+    """
     if df.empty:
         return pd.DataFrame()
     
-    # Filtrar por grupo de estrato si no es "Todos"
+    if cube is None:
+        cube = build_aggregate_cube(df)
+    
+    # Nivel comuna, o comuna x estrato si se filtra por grupo de estrato
     if grupo_estrato != "Todos":
-        if grupo_estrato == "Estratos 1, 2 y 3":
-            df_filtered = df[df['es_123'] == True]
-        else:
-            df_filtered = df[df['es_123'] == False]
+        es_123 = grupo_estrato == "Estratos 1, 2 y 3"
+        niveles = cube.comuna_estrato
+        if es_123 not in niveles.index.get_level_values('es_123'):
+            return pd.DataFrame()
+        summary = niveles.xs(es_123, level='es_123')
     else:
-        df_filtered = df.copy()
+        summary = cube.comuna
     
-    if df_filtered.empty:
+    if summary.empty:
         return pd.DataFrame()
     
     try:
-        # Crear resumen por comuna
-        agg_dict = {}
-        
-        if 'presupuesto_comuna' in df_filtered.columns:
-            agg_dict['presupuesto_comuna'] = 'sum'
-        
-        if 'restante_presupuesto_comuna' in df_filtered.columns:
-            agg_dict['restante_presupuesto_comuna'] = 'sum'
-        
-        if 'numero_usuarios_comuna' in df_filtered.columns:
-            agg_dict['numero_usuarios_comuna'] = 'sum'
-        
-        if 'acumulado_legali_comuna' in df_filtered.columns:
-            agg_dict['acumulado_legali_comuna'] = 'sum'
-        
-        summary = df_filtered.groupby('Comuna Base').agg(agg_dict).reset_index()
+        # Resumen por comuna
+        summary = summary.drop(columns=['fiducias']).reset_index()
         
         # Calcular campos adicionales
         if 'presupuesto_comuna' in summary.columns and 'restante_presupuesto_comuna' in summary.columns:
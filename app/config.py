@@ -14,6 +14,14 @@ DB_CONFIG = {
     'port': int(os.getenv('DB_PORT', 3306))
 }
 
+# Pool de conexiones compartido por todas las sesiones del proceso
+POOL_CONFIG = {
+    'pool_size': int(os.getenv('DB_POOL_SIZE', 5)),
+    'max_lifetime': int(os.getenv('DB_POOL_MAX_LIFETIME', 1800)),  # segundos antes de reciclar
+    'max_waiters': int(os.getenv('DB_POOL_MAX_WAITERS', 20)),      # cola de espera acotada
+    'wait_timeout': float(os.getenv('DB_POOL_WAIT_TIMEOUT', 10))   # segundos esperando conexión
+}
+
 # Mapeo de comunas
 COMUNA_MAPPING = {
     "90456": "90 - SANTA ELENA",
@@ -55,5 +63,31 @@ APP_CONFIG = {
     'layout': 'wide',
     'table_name': 'callg_control_presupuesto_comuna_fidu',
     'current_period': 15,
-    'cache_ttl': 60
+    'cache_ttl': 60,
+    # 'agregado': GROUP BY en MySQL (solo lo que pintan las pantallas) | 'detalle': todas las filas
+    'query_mode': os.getenv('DASHBOARD_QUERY_MODE', 'agregado'),
+    # Cada cuántos segundos el refrescador compartido consulta la base de datos
+    'refresh_interval': int(os.getenv('SNAPSHOT_REFRESH_INTERVAL', 30)),
+    # Último snapshot bueno en disco (arranque en caliente y caídas de MySQL)
+    'snapshot_path': os.getenv('SNAPSHOT_PATH', str(BASE_DIR / 'data' / 'snapshot_presupuesto.arrow')),
+    # Citas: vista de origen y réplica local (SQLite) sincronizada en segundo plano
+    'citas_view': 'vw_citas_PP_EPM_legalizacion',
+    'citas_replica_path': os.getenv('CITAS_REPLICA_PATH', str(BASE_DIR / 'data' / 'citas_replica.sqlite3')),
+    'citas_sync_interval': int(os.getenv('CITAS_SYNC_INTERVAL', 120)),          # segundos entre sincronizaciones
+    'citas_sync_lookback_days': int(os.getenv('CITAS_SYNC_LOOKBACK_DAYS', 7)),  # días que se vuelven a copiar
+    'citas_full_sync_hours': int(os.getenv('CITAS_FULL_SYNC_HOURS', 24)),       # copia completa periódica
+    # Caché compartida de búsquedas de citas (LRU + TTL; "sin resultados" dura menos)
+    'citas_cache_size': int(os.getenv('CITAS_CACHE_SIZE', 500)),
+    'citas_cache_ttl': int(os.getenv('CITAS_CACHE_TTL', 300)),
+    'citas_negative_ttl': int(os.getenv('CITAS_NEGATIVE_TTL', 60)),
+    # Citas por página en la consulta por documento ("Cargar más" trae la siguiente)
+    'citas_page_size': int(os.getenv('CITAS_PAGE_SIZE', 100)),
+    # Consulta masiva: documentos por consulta IN (...)
+    'citas_bulk_chunk_size': int(os.getenv('CITAS_BULK_CHUNK_SIZE', 500)),
+    # URL pública desde la que el navegador pide /assets (CDN o proxy delante de
+    # la app); vacío = el mismo origen de Streamlit, donde las monta `python -m app`
+    'companion_public_url': os.getenv('COMPANION_PUBLIC_URL', '').rstrip('/'),
+    # Eventos en vivo del kiosco (SSE): latido para conexiones ociosas y eventos en cola por pantalla
+    'kiosk_heartbeat': int(os.getenv('KIOSK_HEARTBEAT', 15)),
+    'kiosk_event_queue': int(os.getenv('KIOSK_EVENT_QUEUE', 8))
 }
@@ -1,52 +1,335 @@
 # app/database.py - VERSIÓN SOLO DOCUMENTO
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
 import mysql.connector
 from mysql.connector import Error
+from mysql.connector.errors import PoolError
 import pandas as pd
-import streamlit as st
-from app.config import DB_CONFIG
+from app.config import APP_CONFIG, DB_CONFIG, POOL_CONFIG
+from app.schema import BUDGET_KEY_COLUMNS, build_select, get_projection, get_sum_columns
+from app.utils import extraer_nombre_y_documento
+
+logger = logging.getLogger(__name__)
+
+# Columnas de la vista de citas que usa la aplicación
+CITAS_COLUMNS = ['taquilla', 'hora_inicio', 'fecha', 'estado', 'nombre', 'fondo']
+CITAS_COLUMNS_SQL = ", ".join(CITAS_COLUMNS)
+
+class ConnectionPool:
+    """
+    Pool de conexiones MySQL compartido por todo el proceso.
+    
+    - Valida cada conexión al entregarla (ping) y descarta las caídas
+    - Recicla conexiones que superan max_lifetime segundos
+    - Cola de espera acotada: si hay más de max_waiters esperando, falla de inmediato
+    """
+    
+    def __init__(self, config, pool_size=5, max_lifetime=1800, max_waiters=20, wait_timeout=10):
+        self.config = config
+        self.pool_size = pool_size
+        self.max_lifetime = max_lifetime
+        self.max_waiters = max_waiters
+        self.wait_timeout = wait_timeout
+        
+        self._idle = deque()  # (conexión, momento de creación)
+        self._in_use = 0
+        self._waiting = 0
+        self._cond = threading.Condition()
+        self._stats = {
+            'checkouts': 0,
+            'created': 0,
+            'recycled': 0,
+            'discarded': 0,
+            'timeouts': 0,
+            'rejected': 0,
+            'total_wait': 0.0,
+            'max_wait': 0.0
+        }
+    
+    def _create(self):
+        """Abrir una conexión nueva"""
+        connection = mysql.connector.connect(**self.config)
+        # Autocommit evita que una conexión reutilizada quede "congelada"
+        # en el snapshot REPEATABLE READ de una consulta anterior
+        connection.autocommit = True
+        with self._cond:
+            self._stats['created'] += 1
+        return connection, time.monotonic()
+    
+    def _expired(self, created_at):
+        return time.monotonic() - created_at > self.max_lifetime
+    
+    def _close_quietly(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+    
+    def _validate(self, connection, created_at):
+        """Verificar que una conexión ociosa sigue siendo utilizable"""
+        if self._expired(created_at):
+            with self._cond:
+                self._stats['recycled'] += 1
+            return False
+        try:
+            connection.ping(reconnect=False)
+            return True
+        except Error:
+            with self._cond:
+                self._stats['discarded'] += 1
+            return False
+    
+    def _acquire(self):
+        """Reservar un cupo del pool y retornar (conexión, creada_en)"""
+        start = time.monotonic()
+        
+        with self._cond:
+            while True:
+                if self._idle:
+                    connection, created_at = self._idle.pop()  # LIFO: la más "caliente"
+                    break
+                if self._in_use < self.pool_size:
+                    connection, created_at = None, None
+                    break
+                if self._waiting >= self.max_waiters:
+                    self._stats['rejected'] += 1
+                    raise PoolError(
+                        f"Cola de espera llena ({self.max_waiters} solicitudes esperando)"
+                    )
+                remaining = self.wait_timeout - (time.monotonic() - start)
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolError(
+                        f"Sin conexiones disponibles tras {self.wait_timeout:.0f}s de espera"
+                    )
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            
+            self._in_use += 1
+            wait = time.monotonic() - start
+            self._stats['checkouts'] += 1
+            self._stats['total_wait'] += wait
+            self._stats['max_wait'] = max(self._stats['max_wait'], wait)
+        
+        # Validar / crear fuera del lock para no bloquear a los demás
+        try:
+            if connection is not None and not self._validate(connection, created_at):
+                self._close_quietly(connection)
+                connection = None
+            if connection is None:
+                connection, created_at = self._create()
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        
+        return connection, created_at
+    
+    def _release(self, connection, created_at, healthy):
+        """Devolver la conexión al pool (o cerrarla si no sirve)"""
+        keep = healthy and not self._expired(created_at)
+        if not keep:
+            self._close_quietly(connection)
+        
+        with self._cond:
+            self._in_use -= 1
+            if keep:
+                self._idle.append((connection, created_at))
+            elif healthy:
+                self._stats['recycled'] += 1
+            else:
+                self._stats['discarded'] += 1
+            self._cond.notify()
+    
+    @contextmanager
+    def connection(self):
+        """Context manager que presta una conexión validada del pool"""
+        connection, created_at = self._acquire()
+        healthy = True
+        try:
+            yield connection
+        except Error:
+            # Ante un error de MySQL no sabemos en qué estado quedó la conexión
+            healthy = False
+            raise
+        finally:
+            self._release(connection, created_at, healthy)
+    
+    def stats(self):
+        """Estadísticas del pool: en uso, ociosas y tiempos de espera"""
+        with self._cond:
+            checkouts = self._stats['checkouts']
+            return {
+                'pool_size': self.pool_size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'waiting': self._waiting,
+                'checkouts': checkouts,
+                'created': self._stats['created'],
+                'recycled': self._stats['recycled'],
+                'discarded': self._stats['discarded'],
+                'timeouts': self._stats['timeouts'],
+                'rejected': self._stats['rejected'],
+                'avg_wait_ms': (self._stats['total_wait'] / checkouts * 1000) if checkouts else 0.0,
+                'max_wait_ms': self._stats['max_wait'] * 1000
+            }
+
+def _keys_condition(keys):
+    """Filtro SQL `(comuna, idfiducia) IN ((...), ...)` y sus parámetros"""
+    key_columns = ", ".join(f"`{col}`" for col in BUDGET_KEY_COLUMNS)
+    row_placeholder = "(" + ", ".join(["%s"] * len(BUDGET_KEY_COLUMNS)) + ")"
+    placeholders = ", ".join([row_placeholder] * len(keys))
+    params = [value for key in keys for value in key]
+    return f"({key_columns}) IN ({placeholders})", params
 
 class DatabaseManager:
     def __init__(self):
         self.config = DB_CONFIG
+        # Un solo pool por proceso: `db` se instancia una vez al importar el módulo
+        self.pool = ConnectionPool(self.config, **POOL_CONFIG)
+        # Último error de consulta por hilo (las consultas corren en el hilo del
+        # refrescador, sin contexto de Streamlit: no hay dónde mostrar un st.error)
+        self._errors = threading.local()
     
-    def get_connection(self):
-        """Crear y retornar una conexión a la base de datos"""
+    def last_error(self):
+        """Error de la última consulta hecha en el hilo actual, o None si respondió"""
+        return getattr(self._errors, 'message', None)
+    
+    def _execute(self, query, params=None, dictionary=False):
+        """Ejecutar una consulta con una conexión del pool y retornar (columnas, filas)"""
+        self._errors.message = None
         try:
-            connection = mysql.connector.connect(**self.config)
-            if connection.is_connected():
-                return connection
+            with self.pool.connection() as connection:
+                cursor = connection.cursor(dictionary=dictionary)
+                try:
+                    cursor.execute(query, params or ())
+                    columns = [desc[0] for desc in cursor.description or []]
+                    return columns, cursor.fetchall()
+                finally:
+                    cursor.close()
+        except PoolError as e:
+            self._errors.message = f"Base de datos ocupada: {e}"
+            logger.error("Base de datos ocupada: %s", e)
             return None
         except Error as e:
-            st.error(f"❌ Error al conectar con MySQL: {e}")
+            self._errors.message = f"Error al ejecutar consulta: {e}"
+            logger.error("Error al ejecutar consulta: %s", e)
             return None
     
     def execute_query(self, query, params=None):
         """Ejecutar una consulta y retornar resultados como diccionarios"""
-        connection = self.get_connection()
-        if connection is None:
-            return None
-        
-        try:
-            cursor = connection.cursor(dictionary=True)
-            cursor.execute(query, params or ())
-            results = cursor.fetchall()
-            cursor.close()
-            connection.close()
-            return results
-        except Error as e:
-            st.error(f"❌ Error al ejecutar consulta: {e}")
-            if connection.is_connected():
-                connection.close()
+        result = self._execute(query, params, dictionary=True)
+        return result[1] if result is not None else None
+    
+    def execute_query_columnar(self, query, params=None):
+        """
+        Ejecutar una consulta y retornar (columnas, filas) con filas como tuplas.
+        Evita crear un diccionario por fila; útil para resultados grandes.
+        """
+        return self._execute(query, params, dictionary=False)
+    
+    def execute_query_frame(self, query, params=None):
+        """Ejecutar una consulta y retornar un DataFrame construido desde las tuplas"""
+        result = self.execute_query_columnar(query, params)
+        if result is None:
             return None
+        columns, rows = result
+        # coerce_float convierte los DECIMAL de MySQL a float (columnas numéricas reales)
+        return pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+    
+    def get_pool_stats(self):
+        """Estadísticas del pool de conexiones"""
+        return self.pool.stats()
+    
+    def fetch_all_data(self, table_name, period=15, columns=None):
+        """Obtener los datos de una tabla para un periodo (solo columnas registradas)"""
+        query = build_select(table_name, columns or get_projection())
+        return self.execute_query(query, (period,))
+    
+    def fetch_all_data_frame(self, table_name, period=15, columns=None, keys=None):
+        """
+        Obtener los datos de un periodo directamente como DataFrame tipado.
+        Con `keys` (lista de tuplas comuna, idfiducia) trae solo esas filas.
+        """
+        where, params = "periodo = %s", [period]
+        if keys is not None:
+            keys_sql, keys_params = _keys_condition(keys)
+            where += f" AND {keys_sql}"
+            params += keys_params
+        query = build_select(table_name, columns or get_projection(), where=where)
+        return self.execute_query_frame(query, params)
     
-    def fetch_all_data(self, table_name, period=15):
-        """Obtener todos los datos de una tabla para un periodo específico"""
+    def fetch_aggregated_frame(self, table_name, period=15, columns=None, keys=None):
+        """
+        Obtener los datos del periodo ya agregados en MySQL.
+        Agrupa por comuna (el código incluye el estrato: 123/456) y fiducia,
+        que es el nivel más fino que pintan las tarjetas y tablas.
+        Con `keys` (lista de tuplas comuna, idfiducia) trae solo esas filas.
+        """
+        key_columns = ", ".join(f"`{col}`" for col in BUDGET_KEY_COLUMNS)
+        sums = ", ".join(
+            f"SUM(`{col}`) AS `{col}`" for col in get_sum_columns(columns)
+        )
+        where, params = "periodo = %s", [period]
+        if keys is not None:
+            keys_sql, keys_params = _keys_condition(keys)
+            where += f" AND {keys_sql}"
+            params += keys_params
+        query = f"""
+        SELECT {key_columns}, {sums}
+        FROM {table_name}
+        WHERE {where}
+        GROUP BY {key_columns}
+        """
+        return self.execute_query_frame(query, params)
+    
+    def fetch_row_checksums(self, table_name, period=15, columns=None):
+        """
+        Checksum por llave (comuna, idfiducia) del periodo: permite saber qué
+        filas cambiaron sin traerlas. Mismo CRC32 que usa get_data_fingerprint.
+        """
+        columns = columns or get_projection()
+        key_columns = ", ".join(f"`{col}`" for col in BUDGET_KEY_COLUMNS)
+        row_values = ", ".join(f"`{col}`" for col in columns)
         query = f"""
-        SELECT * 
-        FROM {table_name} 
+        SELECT {key_columns}, BIT_XOR(CRC32(CONCAT_WS('|', {row_values}))) AS checksum
+        FROM {table_name}
         WHERE periodo = %s
+        GROUP BY {key_columns}
         """
-        return self.execute_query(query, (period,))
+        return self.execute_query_frame(query, (period,))
+    
+    def get_data_fingerprint(self, table_name, period=15, columns=None):
+        """
+        Huella barata del periodo para detectar cambios sin traer los datos:
+        número de filas, sumas y un checksum (XOR de CRC32 por fila).
+        Retorna una tupla comparable, o None si la consulta falla.
+        """
+        columns = columns or get_projection()
+        sums = ", ".join(
+            f"SUM(`{col}`) AS `{col}`" for col in get_sum_columns(columns)
+        )
+        row_values = ", ".join(f"`{col}`" for col in columns)
+        query = f"""
+        SELECT 
+            COUNT(*) AS filas,
+            {sums},
+            BIT_XOR(CRC32(CONCAT_WS('|', {row_values}))) AS checksum
+        FROM {table_name}
+        WHERE periodo = %s
+        """
+        result = self.execute_query_columnar(query, (period,))
+        if not result or not result[1]:
+            return None
+        # Normalizar a texto para que la tupla sea estable (DECIMAL, None, etc.)
+        return tuple(str(value) for value in result[1][0])
     
     def get_citas_by_documento(self, documento):
         """
@@ -55,24 +338,39 @@ class DatabaseManager:
         """
         if not documento or str(documento).strip() == "":
             return None
+        documento = str(documento).strip()
         
-        # Buscar documentos que terminen con el número ingresado
-        # Ej: Si nombre = "Juan Pérez - 123456789", buscar "%123456789"
-        query = """
-        SELECT 
-            taquilla,
-            hora_inicio,
-            fecha,
-            estado,
-            nombre,
-            fondo
-        FROM vw_citas_PP_EPM_legalizacion
+        query = f"""
+        SELECT {CITAS_COLUMNS_SQL}
+        FROM {APP_CONFIG['citas_view']}
         WHERE nombre LIKE %s
         ORDER BY fecha DESC, hora_inicio DESC
         """
         
-        # Buscar documento al final del campo nombre
-        return self.execute_query(query, (f"%{documento}%",))
+        results = self.execute_query(query, (f"%{documento}%",))
+        if results is None:
+            return None
+        # El LIKE también encuentra documentos que CONTIENEN el número
+        # (ej: 123 dentro de 91234); solo se dejan las coincidencias exactas
+        return [
+            row for row in results
+            if extraer_nombre_y_documento(row.get('nombre'))[1] == documento
+        ]
+    
+    def fetch_citas_view(self, fecha_desde=None):
+        """
+        Traer la vista de citas como (columnas, filas) para la réplica local.
+        Con fecha_desde solo trae las citas de esa fecha en adelante (sincronización incremental).
+        """
+        where, params = "", ()
+        if fecha_desde is not None:
+            where, params = "WHERE fecha >= %s", (fecha_desde,)
+        query = f"""
+        SELECT {CITAS_COLUMNS_SQL}
+        FROM {APP_CONFIG['citas_view']}
+        {where}
+        """
+        return self.execute_query_columnar(query, params)
 
 # Instancia global de la base de datos
 db = DatabaseManager()
\ No newline at end of file
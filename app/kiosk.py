@@ -0,0 +1,208 @@
+# app/kiosk.py - VISTA DE SOLO LECTURA PARA TELEVISORES (HTML PRERENDERIZADO, SIN SESIÓN DE STREAMLIT)
+import asyncio
+import hashlib
+import tornado.web
+from jinja2 import Environment
+from app.aggregates import get_aggregate_cube, cube_totals
+from app.assets import stylesheet_href
+from app.cache import data_cache
+from app.components.cards import (
+    GRID_STYLESHEETS, build_fiducias_sections_html, format_currency_complete,
+    format_number_integer, ordenar_comunas, partition_fiducias
+)
+from app.config import APP_CONFIG
+from app.singleflight import fetch_flight
+from app.snapshot import refresher
+
+KIOSK_STYLESHEETS = GRID_STYLESHEETS + ('css/kiosk.css',)
+
+# Las secciones del grid ya vienen como HTML (|safe); el resto se escapa
+_KIOSK_ENV = Environment(autoescape=True)
+
+_KIOSK_SOURCE = '''<!DOCTYPE html>
+<html lang="es">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <meta name="kiosk-build" content="{{ build }}">
+    <title>Monitor de Recursos - Sapiencia</title>
+    {% for href in stylesheets %}<link href="{{ href }}" rel="stylesheet">
+    {% endfor %}
+</head>
+<body>
+    <div id="kiosk">
+        <div class="kiosk-titulo">📊 MONITOR DE RECURSOS POR COMUNA</div>
+        <div class="kiosk-subtitulo">Sapiencia - Convocatoria 2026-1</div>
+        {% if sin_conexion %}
+        <div class="kiosk-aviso">⚠️ SIN CONEXIÓN A LA BASE DE DATOS - Mostrando los últimos datos disponibles</div>
+        {% endif %}
+        <div class="kiosk-resumen">
+            <div class="kiosk-metrica">
+                <div class="kiosk-metrica-label">👥 USUARIOS LEGALIZADOS</div>
+                <div class="kiosk-metrica-valor">{{ usuarios }}</div>
+            </div>
+            <div class="kiosk-metrica estrato-123">
+                <div class="kiosk-metrica-label">🔵 Estratos 1-3</div>
+                <div class="kiosk-metrica-valor">{{ usuarios_123 }}</div>
+            </div>
+            <div class="kiosk-metrica estrato-456">
+                <div class="kiosk-metrica-label">🟢 Estratos 4-6</div>
+                <div class="kiosk-metrica-valor">{{ usuarios_456 }}</div>
+            </div>
+            <div class="kiosk-metrica">
+                <div class="kiosk-metrica-label">PRESUPUESTO TOTAL</div>
+                <div class="kiosk-metrica-valor">{{ presupuesto }}</div>
+            </div>
+        </div>
+        <div class="fiducias-container">
+            <div class="comunas-sections">{{ secciones|safe }}</div>
+        </div>
+        <div class="kiosk-pie">Actualizado: {{ actualizado }} | Sapiencia - Agencia de Educación Postsecundaria de Medellín</div>
+    </div>
+    <script>
+    // Cada versión nueva llega por /kiosk/events (SSE) y solo entonces se pide la página
+    // con If-None-Match (cache: "no-cache"). Si el canal no está abierto se consulta
+    // cada intervalo; con el canal abierto, una consulta de respaldo cada 5 intervalos.
+    // Si cambió la versión solo se reemplaza el contenido; si cambió el despliegue
+    // (CSS nuevos) se recarga la página.
+    (function () {
+        var etag = {{ etag|tojson }};
+        var build = {{ build|tojson }};
+        var intervalo = {{ intervalo_ms }};
+        var eventos = null;
+        var ultimaConsulta = Date.now();
+
+        function actualizar() {
+            ultimaConsulta = Date.now();
+            fetch(window.location.pathname, { cache: "no-cache" }).then(function (respuesta) {
+                var nueva = respuesta.headers.get("ETag");
+                if (!respuesta.ok || !nueva || nueva === etag) {
+                    return null;
+                }
+                etag = nueva;
+                return respuesta.text();
+            }).then(function (html) {
+                if (!html) {
+                    return;
+                }
+                var doc = new DOMParser().parseFromString(html, "text/html");
+                var meta = doc.querySelector('meta[name="kiosk-build"]');
+                if (!meta || meta.getAttribute("content") !== build) {
+                    window.location.reload();
+                    return;
+                }
+                document.getElementById("kiosk").replaceWith(doc.getElementById("kiosk"));
+            }).catch(function () {});  // sin red: se sigue mostrando lo último
+        }
+
+        if (window.EventSource) {
+            eventos = new EventSource(window.location.pathname.replace(/\/?$/, "/events"));
+            eventos.addEventListener("diff", actualizar);
+            eventos.addEventListener("resync", actualizar);
+        }
+        setInterval(function () {
+            var abierto = eventos !== null && eventos.readyState === 1;
+            if (!abierto || Date.now() - ultimaConsulta >= intervalo * 5) {
+                actualizar();
+            }
+        }, intervalo);
+    })();
+    </script>
+</body>
+</html>
+'''
+_KIOSK_TEMPLATE = _KIOSK_ENV.from_string(_KIOSK_SOURCE)
+
+# Relativas a {base}/kiosk, salvo que los assets se publiquen en otro origen
+_ASSETS_BASE = f"{APP_CONFIG['companion_public_url']}/assets/" if APP_CONFIG['companion_public_url'] else "assets/"
+_STYLESHEET_HREFS = [stylesheet_href(ruta, _ASSETS_BASE) for ruta in KIOSK_STYLESHEETS]
+
+# Identifica plantilla + CSS publicados: el ETag cambia también con cada despliegue,
+# aunque la versión del snapshot (que se restaura del disco) sea la misma
+_KIOSK_BUILD = hashlib.blake2b(
+    '\n'.join([_KIOSK_SOURCE, *_STYLESHEET_HREFS]).encode('utf-8'), digest_size=5
+).hexdigest()
+
+def render_kiosk_html(snapshot, etag, sin_conexion=False):
+    """Página completa del kiosco para un snapshot (resumen + grid de todas las comunas)"""
+    df = snapshot.df
+    cube = get_aggregate_cube(df, snapshot.version)
+    totales, por_estrato = cube_totals(cube)
+
+    if df.empty:
+        secciones = ''
+    else:
+        comunas = ordenar_comunas(df['Comuna Base'].unique())
+        secciones = build_fiducias_sections_html(comunas, partition_fiducias(df), cube)
+
+    return _KIOSK_TEMPLATE.render(
+        build=_KIOSK_BUILD,
+        etag=etag,
+        stylesheets=_STYLESHEET_HREFS,
+        sin_conexion=sin_conexion,
+        usuarios=format_number_integer(totales['numero_usuarios_comuna']),
+        usuarios_123=format_number_integer(por_estrato[True]['numero_usuarios_comuna'] if por_estrato[True] else 0),
+        usuarios_456=format_number_integer(por_estrato[False]['numero_usuarios_comuna'] if por_estrato[False] else 0),
+        presupuesto=format_currency_complete(totales['presupuesto_comuna']),
+        secciones=secciones,
+        actualizado=snapshot.published_at.strftime('%d/%m/%Y %I:%M %p'),
+        intervalo_ms=APP_CONFIG['refresh_interval'] * 1000
+    )
+
+def get_kiosk_page():
+    """
+    (etag, html) de la versión vigente, o None si aún no hay datos.
+    El HTML se genera una sola vez por versión (caché versionada + single-flight):
+    cincuenta pantallas cuestan lo mismo que una.
+    """
+    snapshot = refresher.latest()
+    if snapshot is None:
+        return None
+
+    sin_conexion = refresher.last_error is not None
+    etag = f'"kiosk-{_KIOSK_BUILD}-{snapshot.version}-{int(sin_conexion)}"'
+    dataset = (APP_CONFIG['table_name'], APP_CONFIG['current_period'])
+    html = data_cache.get(*dataset, ('kiosk_html', etag))
+    if html is None:
+        html = fetch_flight.do(('kiosk', etag), lambda: render_kiosk_html(snapshot, etag, sin_conexion))
+        data_cache.set(*dataset, ('kiosk_html', etag), html)
+    return etag, html
+
+class KioskHandler(tornado.web.RequestHandler):
+    """GET /kiosk: página prerenderizada con ETag; las pantallas reciben 304 mientras no cambie"""
+
+    async def get(self):
+        # Leer el snapshot (y generar el HTML si es una versión nueva) fuera del event loop
+        pagina = await asyncio.get_running_loop().run_in_executor(None, get_kiosk_page)
+        if pagina is None:
+            self.set_status(503)
+            self.set_header("Retry-After", str(APP_CONFIG['refresh_interval']))
+            self.write("Cargando datos...")
+            return
+
+        etag, html = pagina
+        self.set_header("Cache-Control", "no-cache")  # guardar, pero siempre revalidar
+        self.set_header("Etag", etag)
+        if self.check_etag_header():
+            self.set_status(304)
+            return
+        self.set_header("Content-Type", "text/html; charset=utf-8")
+        self.write(html)
+
+class KioskHealthHandler(tornado.web.RequestHandler):
+    """
+    GET /kiosk/health: 200 si el kiosco tiene datos que mostrar (aunque sean
+    los del disco con la BD caída), 503 si todavía no hay ningún snapshot
+    """
+
+    def get(self):
+        snapshot = refresher.latest(timeout=0)  # no esperar: solo reportar
+        self.set_header("Cache-Control", "no-store")
+        if snapshot is None:
+            self.set_status(503)
+        self.write({
+            'ok': snapshot is not None,
+            'version': snapshot.version if snapshot is not None else None,
+            'origen': snapshot.source if snapshot is not None else None,
+            'sin_conexion': refresher.last_error is not None
+        })
@@ -0,0 +1,203 @@
+# app/live_events.py - EVENTOS EN VIVO PARA LOS KIOSCOS (SSE): CAMBIOS POR FIDUCIA EN CADA VERSIÓN
+import asyncio
+import json
+import threading
+import pandas as pd
+import tornado.iostream
+import tornado.web
+from app.aggregates import build_aggregate_cube, get_aggregate_cube
+from app.config import APP_CONFIG
+from app.snapshot import refresher
+
+# Columnas que se comparan por fiducia entre versiones
+DIFF_COLUMNS = ['restante_presupuesto_comuna', 'numero_usuarios_comuna']
+# Tope de fiducias listadas en un evento (el resto solo se cuenta en 'total')
+MAX_CAMBIOS_POR_EVENTO = 500
+
+# Comentario SSE: mantiene viva la conexión a través de proxies sin despertar al cliente
+HEARTBEAT = b": ping\n\n"
+
+def _entero(valor):
+    return None if pd.isna(valor) else int(valor)
+
+def fiducia_changes(anterior, nuevo):
+    """
+    Fiducias cuyo restante o usuarios cambió entre dos niveles 'fiducia' del
+    cubo (índice: comuna base, es_123, idfiducia). Las que aparecen o
+    desaparecen también cuentan, con None del lado que falta.
+    """
+    indice = anterior.index.union(nuevo.index)
+    antes = anterior[DIFF_COLUMNS].reindex(indice)
+    ahora = nuevo[DIFF_COLUMNS].reindex(indice)
+    distintos = (antes.ne(ahora) & ~(antes.isna() & ahora.isna())).any(axis=1)
+
+    cambios = []
+    for (comuna, es_123, idfiducia), fila_antes, fila_ahora in zip(
+        indice[distintos.to_numpy()],
+        antes[distintos].itertuples(index=False),
+        ahora[distintos].itertuples(index=False)
+    ):
+        cambios.append({
+            'comuna': comuna,
+            'es_123': bool(es_123),
+            'idfiducia': str(idfiducia),
+            'restante': _entero(fila_ahora[0]),
+            'usuarios': _entero(fila_ahora[1]),
+            'restante_anterior': _entero(fila_antes[0]),
+            'usuarios_anterior': _entero(fila_antes[1])
+        })
+    return cambios
+
+def format_event(nombre, datos, event_id=None):
+    """Mensaje SSE ya codificado (se arma una vez y se comparte entre todos los clientes)"""
+    lineas = []
+    if event_id is not None:
+        lineas.append(f"id: {event_id}")
+    lineas.append(f"event: {nombre}")
+    lineas.append(f"data: {json.dumps(datos, ensure_ascii=False)}")
+    return ("\n".join(lineas) + "\n\n").encode('utf-8')
+
+class EventHub:
+    """
+    Reparte los eventos del refrescador a las pantallas suscritas.
+
+    Corre en el event loop del servidor de Streamlit: cada cliente es una
+    corrutina esperando en su propia cola acotada, así miles de conexiones
+    ociosas no cuestan hilos. El refrescador publica desde su hilo con
+    call_soon_threadsafe y nunca se bloquea. Si un cliente lento llena su cola
+    (contrapresión), se descarta lo pendiente y se le manda un solo 'resync':
+    al recibirlo vuelve a pedir la página completa.
+    """
+
+    def __init__(self, queue_size=8, heartbeat=15):
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self.last_id = None
+        self._loop = None
+        self._clients = set()
+        self._lock = threading.Lock()
+        self._stats = {'published': 0, 'resyncs': 0}
+        self._fiducias = None  # (versión, nivel 'fiducia' del cubo) del último evento
+
+    def attach(self, loop):
+        """Event loop donde viven los clientes (el del servidor Tornado de Streamlit)"""
+        self._loop = loop
+
+    def subscribe(self):
+        cola = asyncio.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._clients.add(cola)
+        return cola
+
+    def unsubscribe(self, cola):
+        with self._lock:
+            self._clients.discard(cola)
+
+    def publish(self, nombre, datos, event_id=None):
+        """Publicar desde cualquier hilo"""
+        if self._loop is None:
+            return
+        mensaje = format_event(nombre, datos, event_id)
+        if event_id is not None:
+            self.last_id = str(event_id)
+        self._loop.call_soon_threadsafe(self._fanout, mensaje)
+
+    def _fanout(self, mensaje):
+        with self._lock:
+            clientes = list(self._clients)
+            self._stats['published'] += 1
+        resync = format_event('resync', {'version': self.last_id}, self.last_id)
+        for cola in clientes:
+            try:
+                cola.put_nowait(mensaje)
+            except asyncio.QueueFull:
+                # Cliente lento: lo pendiente ya no sirve, basta con que se resincronice
+                while not cola.empty():
+                    cola.get_nowait()
+                cola.put_nowait(resync)
+                with self._lock:
+                    self._stats['resyncs'] += 1
+
+    def on_snapshot(self, anterior, publicado):
+        """Listener del refrescador: evento 'diff' con las fiducias que cambiaron"""
+        with self._lock:
+            sin_clientes = not self._clients
+        if self._loop is None or sin_clientes:
+            self._fiducias = None
+            return
+
+        nuevo = get_aggregate_cube(publicado.df, publicado.version).fiducia
+        if anterior is None:
+            previo = nuevo.iloc[0:0]
+        elif self._fiducias is not None and self._fiducias[0] == anterior.version:
+            previo = self._fiducias[1]
+        else:
+            previo = build_aggregate_cube(anterior.df).fiducia
+        self._fiducias = (publicado.version, nuevo)
+
+        cambios = fiducia_changes(previo, nuevo)
+        self.publish('diff', {
+            'version': publicado.version,
+            'total': len(cambios),
+            'cambios': cambios[:MAX_CAMBIOS_POR_EVENTO]
+        }, event_id=publicado.version)
+
+    def stats(self):
+        """Pantallas conectadas, eventos publicados y resincronizaciones por contrapresión"""
+        with self._lock:
+            return dict(self._stats, subscribers=len(self._clients))
+
+class KioskEventsHandler(tornado.web.RequestHandler):
+    """GET /kiosk/events: canal SSE con los eventos 'diff' del refrescador y latidos"""
+
+    def prepare(self):
+        # Sin gzip (Streamlit lo activa para toda la app y Tornado considera
+        # comprimible text/event-stream): cada conexión ociosa mantendría su
+        # propio estado de zlib (~256 KB). Los eventos son pocos y pequeños.
+        self._transforms = [
+            t for t in self._transforms if not isinstance(t, tornado.web.GZipContentEncoding)
+        ]
+
+    async def get(self):
+        self.set_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.set_header("Cache-Control", "no-cache")
+        self.set_header("X-Accel-Buffering", "no")  # sin buffer en nginx
+        self._cola = live_events.subscribe()
+        try:
+            # Reconexión con una versión vieja: se perdió algún evento, pedir la página
+            ultimo = self.request.headers.get("Last-Event-ID")
+            if ultimo and live_events.last_id and ultimo != live_events.last_id:
+                self.write(format_event('resync', {'version': live_events.last_id}, live_events.last_id))
+            self.write(b"retry: 5000\n\n")
+            await self.flush()
+
+            while True:
+                try:
+                    mensaje = await asyncio.wait_for(self._cola.get(), timeout=live_events.heartbeat)
+                except asyncio.TimeoutError:
+                    mensaje = HEARTBEAT
+                if mensaje is None:  # la pantalla cerró la conexión
+                    break
+                self.write(mensaje)
+                # Esperar a que el socket lo acepte: un cliente lento solo se atrasa él
+                await self.flush()
+        except tornado.iostream.StreamClosedError:
+            pass
+        finally:
+            live_events.unsubscribe(self._cola)
+
+    def on_connection_close(self):
+        cola = getattr(self, '_cola', None)
+        if cola is not None:
+            try:
+                cola.put_nowait(None)
+            except asyncio.QueueFull:
+                cola.get_nowait()
+                cola.put_nowait(None)
+
+# Instancia global (una por proceso) suscrita a las versiones que publica el refrescador
+live_events = EventHub(
+    queue_size=APP_CONFIG['kiosk_event_queue'],
+    heartbeat=APP_CONFIG['kiosk_heartbeat']
+)
+refresher.add_listener(live_events.on_snapshot)
@@ -1,29 +1,51 @@
 # app/main.py - VERSIÓN CON INICIALIZACIÓN COMPLETA
 import streamlit as st
-import time
 import pandas as pd
 from pathlib import Path
+from app.live_events import live_events
 from app.config import APP_CONFIG
 from app.database import db
-from app.utils import process_comuna_data, get_colombia_time
-from app.components.header import render_header, render_control_bar
-from app.pages.overview import render_overview_page
+from app.snapshot import refresher
+from app.singleflight import fetch_flight
+from app.utils import get_colombia_time
+from app.components.header import render_header, render_control_bar, render_staleness_badge
+from app.pages.overview import render_overview_title, render_overview_data
 from app.pages.citas import render_citas_page
 
-@st.cache_data(ttl=APP_CONFIG['cache_ttl'])
 def fetch_data():
-    """Obtener datos de la base de datos"""
+    """
+    Obtener el último snapshot publicado por el refrescador compartido.
+    Ninguna sesión consulta MySQL directamente: solo leen la versión vigente.
+    """
     try:
-        results = db.fetch_all_data(APP_CONFIG['table_name'], APP_CONFIG['current_period'])
-        
-        if results:
-            df = pd.DataFrame(results)
-            df = process_comuna_data(df)
-            return df
-        return pd.DataFrame()
+        return refresher.latest()
     except Exception as e:
         st.error(f"Error al obtener datos: {e}")
-        return pd.DataFrame()
+        return None
+
+def render_dashboard_data():
+    """
+    Región del dashboard que depende de los datos. Con auto-refresh corre como
+    fragmento periódico: solo esta parte vuelve a leer el snapshot vigente y a
+    dibujarse; sidebar, encabezado y barra de control no se re-ejecutan.
+    """
+    # Obtener datos (versión publicada por el refrescador compartido)
+    with st.spinner("📊 Cargando datos del dashboard..."):
+        snapshot = fetch_data()
+    df = snapshot.df if snapshot is not None else None
+    
+    # Insignia si se sirven datos del disco o la BD no responde
+    render_staleness_badge(snapshot, refresher.last_check, refresher.last_error)
+    
+    if df is not None and not df.empty:
+        render_overview_data(df, data_version=snapshot.version)
+        # La hora avanza con la última consulta del refrescador
+        st.session_state.last_refresh = refresher.last_check or get_colombia_time()
+    
+    elif df is not None and df.empty:
+        st.warning("⚠️ No se encontraron datos para el periodo actual.")
+    else:
+        st.error("❌ Error al conectar con la base de datos.")
 
 def main():
     # Configuración de página
@@ -105,7 +127,29 @@ def main():
         last_update = st.session_state.last_refresh.strftime('%d/%m/%Y %I:%M %p')
         st.caption(f"🕒 {last_update}")
         st.caption("v1.2.0 | Sapiencia - DTF")
-    
+
+        # Estado del pool de conexiones (diagnóstico)
+        with st.expander("🔌 Conexiones BD", expanded=False):
+            pool_stats = db.get_pool_stats()
+            st.caption(
+                f"En uso: {pool_stats['in_use']}/{pool_stats['pool_size']} | "
+                f"Ociosas: {pool_stats['idle']} | En espera: {pool_stats['waiting']}"
+            )
+            st.caption(
+                f"Espera prom.: {pool_stats['avg_wait_ms']:.1f} ms | "
+                f"Máx.: {pool_stats['max_wait_ms']:.1f} ms"
+            )
+            flight_stats = fetch_flight.stats()
+            st.caption(
+                f"Consultas: {flight_stats['executions']} | "
+                f"Compartidas (en espera de otra igual): {flight_stats['coalesced']}"
+            )
+            kiosk_stats = live_events.stats()
+            st.caption(
+                f"Kioscos en vivo: {kiosk_stats['subscribers']} | "
+                f"Eventos: {kiosk_stats['published']} | Resincronizados: {kiosk_stats['resyncs']}"
+            )
+
     # ============================
     # CONTENIDO PRINCIPAL
     # ============================
@@ -116,33 +160,25 @@ def main():
         render_header()
         
         # Renderizar barra de control con auto-refresh
+        refresh_interval = APP_CONFIG['refresh_interval']
         auto_refresh = render_control_bar(
             st.session_state.last_refresh,
-            st.session_state.auto_refresh
+            st.session_state.auto_refresh,
+            refresh_interval
         )
         
         # Actualizar estado de auto_refresh si cambió
         if auto_refresh != st.session_state.auto_refresh:
             st.session_state.auto_refresh = auto_refresh
         
-        # Obtener datos
-        with st.spinner("📊 Cargando datos del dashboard..."):
-            df = fetch_data()
+        render_overview_title()
         
-        if df is not None and not df.empty:
-            render_overview_page(df)
-            
-            # Auto-refresh solo en dashboard
-            if st.session_state.auto_refresh:
-                time.sleep(30)
-                st.session_state.last_refresh = get_colombia_time()
-                st.cache_data.clear()
-                st.rerun()
-        
-        elif df is not None and df.empty:
-            st.warning("⚠️ No se encontraron datos para el periodo actual.")
-        else:
-            st.error("❌ Error al conectar con la base de datos.")
+        # Auto-refresh solo en dashboard: rerun periódico del fragmento de datos
+        # (sin time.sleep ni st.rerun; ningún hilo queda dormido esperando)
+        dashboard_data = st.fragment(run_every=refresh_interval if auto_refresh else None)(
+            render_dashboard_data
+        )
+        dashboard_data()
     
     elif current_page == "citas":
         # Renderizar página de citas
@@ -1,27 +1,13 @@
 # app/pages/citas.py - VERSIÓN CORREGIDA CON width='stretch'
 import streamlit as st
 import pandas as pd
-import re
+from collections import namedtuple
 from datetime import datetime
-from app.utils import get_colombia_time, format_colombia_time
+from app.config import APP_CONFIG
+from app.utils import get_colombia_time, format_colombia_time, extraer_nombres_y_documentos
 from app.database import db
-
-def extraer_nombre_y_documento(texto):
-    """
-    Extrae nombre y documento de un string con formato "Nombre - Documento"
-    """
-    if not isinstance(texto, str):
-        return ("No disponible", "")
-    
-    patron = r'(.+?)\s*-\s*(\d+)'
-    match = re.search(patron, texto)
-    
-    if match:
-        nombre = match.group(1).strip()
-        documento = match.group(2).strip()
-        return (nombre, documento)
-    else:
-        return (texto.strip(), "")
+from app.citas_replica import citas_replica
+from app.citas_cache import citas_cache
 
 def procesar_citas(df):
     """
@@ -33,26 +19,200 @@ def procesar_citas(df):
     df_procesado = df.copy()
     
     if 'nombre' in df_procesado.columns:
-        extracciones = df_procesado['nombre'].apply(extraer_nombre_y_documento)
-        df_procesado[['nombre_persona', 'documento']] = pd.DataFrame(
-            extracciones.tolist(), 
-            index=df_procesado.index
-        )
+        # Extracción vectorizada (sin .apply fila por fila)
+        extracciones = extraer_nombres_y_documentos(df_procesado['nombre'])
+        df_procesado['nombre_persona'] = extracciones['nombre_persona']
+        df_procesado['documento'] = extracciones['documento']
     
     return df_procesado
 
-def get_citas_by_documento(documento):
+class CitasPagina(namedtuple('CitasPagina', ['df', 'total', 'asistidas', 'cursor'])):
     """
-    Obtiene las citas SOLO por documento
+    Resultado de una búsqueda: las citas cargadas (primera página), el total y
+    las asistidas del documento completo, y el cursor para pedir la siguiente
+    página (None si ya están todas).
     """
+    __slots__ = ()
+    
+    @property
+    def empty(self):
+        return self.total == 0
+    
+    def copy(self):
+        return self._replace(df=self.df.copy())
+
+def contar_asistidas(df):
+    """Citas cuyo estado contiene "Asistida" (sin distinguir mayúsculas)"""
+    if 'estado' not in df.columns:
+        return 0
+    return int(df['estado'].str.contains('Asistida', case=False, na=False).sum())
+
+def cargar_citas(documento, force_refresh=False):
+    """
+    Consulta la primera página de citas del documento (coincidencia exacta).
+    Usa la réplica local, donde total y asistidas se calculan en SQL; mientras
+    se sincroniza por primera vez, o si se fuerza la actualización, consulta
+    directamente la BD (todas las citas en una sola página).
+    Retorna None si la consulta falla.
+    """
+    if not force_refresh:
+        pagina = citas_replica.lookup_page(documento, APP_CONFIG['citas_page_size'])
+        if pagina is not None:
+            filas, cursor, (total, asistidas) = pagina
+            df = procesar_citas(pd.DataFrame(filas)) if filas else pd.DataFrame()
+            return CitasPagina(df, total, asistidas, cursor)
+    
     results = db.get_citas_by_documento(documento)
+    if results is None:
+        return None
+    df = procesar_citas(pd.DataFrame(results)) if results else pd.DataFrame()
+    return CitasPagina(df, len(df), contar_asistidas(df), None)
+
+def get_citas_by_documento(documento, force_refresh=False):
+    """
+    Obtiene la primera página de citas SOLO por documento, pasando por la caché
+    compartida (otra sesión pudo haber buscado el mismo documento hace poco)
+    """
+    pagina = citas_cache.get_or_load(
+        documento,
+        lambda doc: cargar_citas(doc, force_refresh=force_refresh),
+        force_refresh=force_refresh
+    )
+    return pagina if pagina is not None else CitasPagina(pd.DataFrame(), 0, 0, None)
+
+def cargar_mas_citas(documento, cursor):
+    """
+    Siguiente página de citas desde la réplica local (no pasa por la caché).
+    Retorna (DataFrame procesado, cursor siguiente o None).
+    """
+    pagina = citas_replica.lookup_page(documento, APP_CONFIG['citas_page_size'], after=cursor)
+    if pagina is None:
+        return pd.DataFrame(), None
+    filas, cursor, _ = pagina
+    return (procesar_citas(pd.DataFrame(filas)) if filas else pd.DataFrame()), cursor
+
+def leer_documentos_csv(archivo):
+    """
+    Leer la lista de documentos de un CSV subido.
+    Usa la columna 'documento' si existe; si no, la primera columna (con o sin encabezado).
+    Retorna (documentos válidos sin repetir, cantidad de valores descartados),
+    o None si el archivo no se puede leer como CSV.
+    """
+    try:
+        df = pd.read_csv(archivo, dtype=str, header=None, skip_blank_lines=True)
+    except pd.errors.EmptyDataError:
+        return [], 0
+    except (pd.errors.ParserError, UnicodeDecodeError):
+        return None
+    if df.empty:
+        return [], 0
     
-    if results:
-        df = pd.DataFrame(results)
-        df = procesar_citas(df)
-        return df
+    encabezado = [str(valor).strip().lower() for valor in df.iloc[0]]
+    if 'documento' in encabezado:
+        valores = df.iloc[1:, encabezado.index('documento')]
     else:
-        return pd.DataFrame()
+        valores = df.iloc[:, 0]
+        # Encabezado no numérico en la primera fila (ej: "cedula")
+        if not es_documento_valido(valores.iloc[0]):
+            valores = valores.iloc[1:]
+    
+    valores = valores.dropna().astype(str).str.strip()
+    validos = valores[valores.str.isdigit()]
+    documentos = list(dict.fromkeys(validos))  # sin repetidos, conservando el orden
+    return documentos, int(len(valores) - len(validos))
+
+def iter_citas_masivas(documentos, chunk_size=500):
+    """
+    Consultar citas de muchos documentos por lotes (una consulta por lote).
+    Genera (documentos procesados, DataFrame procesado del lote, documentos sin
+    consultar) a medida que termina cada lote. Solo se consulta la réplica
+    (documento indexado, extraído con la misma regla de la app): si aún no se
+    ha sincronizado, el lote cuenta como sin consultar (no como "sin citas").
+    """
+    for start in range(0, len(documentos), chunk_size):
+        lote = documentos[start:start + chunk_size]
+        results = citas_replica.lookup_many(lote)
+        if results is None:
+            yield start + len(lote), pd.DataFrame(), len(lote)
+            continue
+        
+        df_lote = procesar_citas(pd.DataFrame(results)) if results else pd.DataFrame()
+        yield start + len(lote), df_lote, 0
+
+def render_bulk_citas_section():
+    """Consulta masiva: CSV de documentos -> tabla combinada y archivo descargable"""
+    if 'citas_bulk_data' not in st.session_state:
+        st.session_state.citas_bulk_data = None
+    
+    with st.expander("📑 CONSULTA MASIVA POR ARCHIVO CSV", expanded=False):
+        archivo = st.file_uploader(
+            "Archivo CSV con documentos",
+            type=["csv"],
+            help="Una columna 'documento' (o los documentos en la primera columna)",
+            key="csv_documentos_citas"
+        )
+        
+        if archivo is not None and st.button("📑 Consultar lote", type="primary", width='stretch'):
+            lectura = leer_documentos_csv(archivo)
+            if lectura is None:
+                st.error("❌ No se pudo leer el archivo: verifique que sea un CSV válido (UTF-8)")
+                return
+            documentos, descartados = lectura
+            if descartados:
+                st.warning(f"⚠️ Se descartaron {descartados} valor(es) que no son documentos válidos")
+            if not documentos:
+                st.error("❌ El archivo no tiene documentos válidos")
+                return
+            
+            progreso = st.progress(0.0, text=f"Consultando {len(documentos)} documentos...")
+            tabla = st.empty()
+            partes = []
+            fallidos = 0
+            
+            for procesados, df_lote, sin_consultar in iter_citas_masivas(documentos, APP_CONFIG['citas_bulk_chunk_size']):
+                fallidos += sin_consultar
+                if not df_lote.empty:
+                    partes.append(df_lote)
+                    # Mostrar lo acumulado a medida que termina cada lote
+                    tabla.dataframe(pd.concat(partes, ignore_index=True), width='stretch', height=400)
+                progreso.progress(
+                    procesados / len(documentos),
+                    text=f"{procesados} de {len(documentos)} documentos consultados"
+                )
+            
+            df_masivo = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame()
+            st.session_state.citas_bulk_data = (documentos, df_masivo, fallidos)
+        
+        if st.session_state.citas_bulk_data is not None:
+            documentos, df_masivo, fallidos = st.session_state.citas_bulk_data
+            encontrados = df_masivo['documento'].nunique() if 'documento' in df_masivo.columns else 0
+            
+            if fallidos:
+                st.error(
+                    f"❌ No se pudieron consultar {fallidos} de {len(documentos)} documentos "
+                    f"(la réplica local de citas aún no termina su primera sincronización). "
+                    f"Los resultados están incompletos: intente de nuevo en unos minutos."
+                )
+            
+            col_res1, col_res2, col_res3 = st.columns(3)
+            with col_res1:
+                st.metric("Documentos consultados", len(documentos) - fallidos)
+            with col_res2:
+                st.metric("Con citas", encontrados)
+            with col_res3:
+                st.metric("Total citas", len(df_masivo))
+            
+            if not df_masivo.empty:
+                columnas = [col for col in ['documento', 'nombre_persona', 'fecha', 'hora_inicio',
+                                            'taquilla', 'estado', 'fondo'] if col in df_masivo.columns]
+                csv = df_masivo[columnas].to_csv(index=False).encode('utf-8')
+                st.download_button(
+                    label="📥 Descargar resultados del lote",
+                    data=csv,
+                    file_name=f"citas_masivo_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                    mime="text/csv",
+                    width='stretch'
+                )
 
 def es_documento_valido(documento):
     """
@@ -64,9 +224,30 @@ def es_documento_valido(documento):
     documento_limpio = str(documento).strip()
     return documento_limpio.isdigit()
 
+def render_replica_status():
+    """Mostrar cuándo se sincronizó por última vez la réplica local de citas"""
+    last_sync = citas_replica.last_sync
+    
+    if last_sync is None:
+        st.caption("📦 Réplica local en preparación: la búsqueda consulta directamente la base de datos "
+                   "y la consulta masiva estará disponible al terminar")
+        return
+    
+    minutos = int((get_colombia_time() - last_sync).total_seconds() // 60)
+    texto = f"📦 Réplica de citas: {format_colombia_time(last_sync)} (hace {minutos} min)"
+    
+    # Más de 3 ciclos sin sincronizar: avisar que los datos pueden estar desactualizados
+    if citas_replica.last_error or minutos * 60 > 3 * citas_replica.interval:
+        st.warning(f"{texto} — la sincronización está atrasada")
+    else:
+        st.caption(texto)
+
 def render_citas_page():
     """Renderiza la página de consulta de citas SOLO por documento"""
     
+    # La réplica local se sincroniza en segundo plano desde la primera visita
+    citas_replica.start()
+    
     # Inicializar variables de session_state
     if 'citas_data' not in st.session_state:
         st.session_state.citas_data = None
@@ -77,6 +258,12 @@ def render_citas_page():
     if 'ultima_actualizacion' not in st.session_state:
         st.session_state.ultima_actualizacion = get_colombia_time()
     
+    if 'citas_resumen' not in st.session_state:
+        st.session_state.citas_resumen = (0, 0)  # (total, asistidas) del documento
+    
+    if 'citas_cursor' not in st.session_state:
+        st.session_state.citas_cursor = None  # cursor de la siguiente página
+    
     # Títulos
     st.markdown("<h1 style='text-align: center; color: #1a73e8; margin-bottom: 10px;'>📋 CONSULTA DE CITAS POR DOCUMENTO</h1>", 
                 unsafe_allow_html=True)
@@ -98,12 +285,22 @@ def render_citas_page():
             key="input_documento_citas"
         )
         
+        # Saltar caché y réplica: consultar directamente la base de datos
+        forzar = st.checkbox(
+            "🔄 Consultar directo en la base de datos",
+            value=False,
+            help="Ignora la caché compartida y la réplica local (más lento)",
+            key="forzar_citas"
+        )
+        
         # Botón de búsqueda - ACTUALIZA LOS DATOS AL PRESIONAR
         buscar = st.button("🔍 Buscar Citas", type="primary", width='stretch')
         
         # Botón Limpiar Búsqueda
         if st.button("🧹 Limpiar Búsqueda", width='stretch'):
             st.session_state.citas_data = None
+            st.session_state.citas_resumen = (0, 0)
+            st.session_state.citas_cursor = None
             st.session_state.last_documento = ""
             st.session_state.ultima_actualizacion = get_colombia_time()
             st.rerun()
@@ -137,16 +334,18 @@ def render_citas_page():
         </div>
         """, unsafe_allow_html=True)
         
+        # Frescura de la réplica local de citas y uso de la caché compartida
+        render_replica_status()
+        cache_stats = citas_cache.stats()
+        st.caption(
+            f"⚡ Caché de búsquedas: {cache_stats['hits'] + cache_stats['negative_hits']} aciertos / "
+            f"{cache_stats['misses']} fallos ({cache_stats['size'] + cache_stats['negative_size']} documentos)"
+        )
+        
         # Mostrar estadísticas si hay datos
         if st.session_state.citas_data is not None and not st.session_state.citas_data.empty:
-            df_citas = st.session_state.citas_data
-            
-            total = len(df_citas)
-            
-            if 'estado' in df_citas.columns:
-                asistidas = df_citas['estado'].str.contains('Asistida', case=False, na=False).sum()
-            else:
-                asistidas = 0
+            # Calculadas sobre todas las citas del documento, no solo las cargadas
+            total, asistidas = st.session_state.citas_resumen
             
             st.markdown("---")
             st.markdown("#### 📊 Estadísticas")
@@ -187,7 +386,11 @@ def render_citas_page():
                 # Mostrar información de búsqueda
                 documento_actual = st.session_state.last_documento
                 if documento_actual:
-                    st.info(f"🔍 Mostrando {len(df_citas)} citas para el documento: **{documento_actual}**")
+                    total_citas = st.session_state.citas_resumen[0]
+                    if len(df_citas) < total_citas:
+                        st.info(f"🔍 Mostrando {len(df_citas)} de {total_citas} citas para el documento: **{documento_actual}**")
+                    else:
+                        st.info(f"🔍 Mostrando {len(df_citas)} citas para el documento: **{documento_actual}**")
                 
                 # PREPARAR Y MOSTRAR LA TABLA
                 df_display = df_citas.copy()
@@ -257,6 +460,21 @@ def render_citas_page():
                         height=min(500, len(df_display) * 40 + 50)
                     )
                     
+                    # Siguiente página bajo demanda
+                    if st.session_state.citas_cursor is not None:
+                        if st.button("⬇️ Cargar más citas", width='stretch', key="cargar_mas_citas"):
+                            with st.spinner("🔍 Cargando más citas..."):
+                                df_mas, cursor = cargar_mas_citas(
+                                    st.session_state.last_documento,
+                                    st.session_state.citas_cursor
+                                )
+                            if not df_mas.empty:
+                                st.session_state.citas_data = pd.concat(
+                                    [st.session_state.citas_data, df_mas], ignore_index=True
+                                )
+                            st.session_state.citas_cursor = cursor
+                            st.rerun()
+                    
                     # Botón para descargar
                     csv = df_display.to_csv(index=False).encode('utf-8')
                     st.download_button(
@@ -287,6 +505,10 @@ def render_citas_page():
             </div>
             """, unsafe_allow_html=True)
     
+    # CONSULTA MASIVA (CSV)
+    st.markdown("---")
+    render_bulk_citas_section()
+    
     # LÓGICA PRINCIPAL DE BÚSQUEDA - SE EJECUTA AL PRESIONAR EL BOTÓN
     if buscar:
         if not documento:
@@ -301,10 +523,12 @@ def render_citas_page():
             # Mostrar spinner mientras se buscan los datos
             with st.spinner("🔍 Buscando citaciones..."):
                 # OBTENER DATOS ACTUALIZADOS DE LA BASE DE DATOS
-                df_citas = get_citas_by_documento(documento)
+                pagina = get_citas_by_documento(documento, force_refresh=forzar)
                 
-                # ACTUALIZAR session_state con los nuevos datos
-                st.session_state.citas_data = df_citas
+                # ACTUALIZAR session_state con los nuevos datos (primera página)
+                st.session_state.citas_data = pagina.df
+                st.session_state.citas_resumen = (pagina.total, pagina.asistidas)
+                st.session_state.citas_cursor = pagina.cursor
                 st.session_state.last_documento = documento
                 st.session_state.ultima_actualizacion = get_colombia_time()
                 
@@ -1,10 +1,11 @@
 # app/pages/detail.py
 import streamlit as st
 import pandas as pd
+from app.aggregates import get_aggregate_cube, cube_totals
 from app.utils import format_currency
 from app.components import render_comuna_metrics
 
-def render_detail_page(df):
+def render_detail_page(df, data_version=None):
     """Renderizar página de detalle por comuna"""
     st.markdown("## 📋 Detalle por Comuna - Tabla de Fiducias")
     
@@ -27,8 +28,9 @@ def render_detail_page(df):
         if not df_comuna.empty:
             st.markdown(f"### 📍 {comuna_seleccionada}")
             
-            # Mostrar métricas de la comuna
-            render_comuna_metrics(df_comuna)
+            # Mostrar métricas de la comuna (totales leídos del cubo de agregados)
+            totales, _ = cube_totals(get_aggregate_cube(df, data_version), df_comuna['Comuna Base'].iloc[0])
+            render_comuna_metrics(df_comuna, totales)
             
             st.markdown("---")
             
@@ -9,23 +9,60 @@ from app.utils import (
     get_colombia_time,  # <-- NUEVA IMPORTACIÓN
     format_colombia_time  # <-- NUEVA IMPORTACIÓN
 )
-from app.components.cards import create_tv_cards_grid
+from app.aggregates import get_aggregate_cube, cube_totals
+from app.components.cards import create_tv_cards_grid, FIDUCIAS_GRID_KEY
 
-def render_overview_page(df):
-    """Renderizar página con filtro de comuna"""
-    
-    # Título principal
+def render_overview_page(df, data_version=None):
+    """
+    Renderizar página con filtro de comuna.
+    data_version identifica los datos (huella); permite reutilizar el HTML ya generado.
+    """
+    render_overview_title()
+    render_overview_data(df, data_version)
+
+def render_overview_title():
+    """Títulos de la página (no dependen de los datos)"""
     st.markdown("<h1 style='text-align: center; color: #1a73e8; margin-bottom: 10px;'>📊 MONITOR DE RECURSOS POR COMUNA</h1>", 
                 unsafe_allow_html=True)
     st.markdown("<h3 style='text-align: center; color: #5f6368; margin-bottom: 30px;'>Sapiencia - Convocatoria 2026-1</h3>", 
                 unsafe_allow_html=True)
+
+def aplicar_clic_en_grid(opciones_comuna, opcion_a_nombre):
+    """
+    Clic en el encabezado de una comuna del grid en vivo: seleccionarla en el
+    filtro (o volver a todas si ya estaba seleccionada). Debe llamarse antes de
+    crear el selector de comuna.
+    """
+    clic = st.session_state.get(FIDUCIAS_GRID_KEY)
+    if not clic or clic.get('clic') == st.session_state.get('grid_clic_atendido'):
+        return
+    st.session_state.grid_clic_atendido = clic.get('clic')
+    
+    nombre_a_opcion = {nombre: opcion for opcion, nombre in opcion_a_nombre.items()}
+    opcion = nombre_a_opcion.get(clic.get('comuna'))
+    if opcion is None:
+        return
+    if st.session_state.get('filtro_comuna') == opcion:
+        st.session_state.filtro_comuna = opciones_comuna[0]  # TODAS LAS COMUNAS
+    else:
+        st.session_state.filtro_comuna = opcion
+
+def render_overview_data(df, data_version=None):
+    """
+    Parte de la página que depende de los datos: métricas, filtro de comuna,
+    tarjetas y pie. Es lo único que se vuelve a ejecutar con el auto-refresh.
+    """
+    
+    # Cubo de agregados: se calcula una vez por versión de datos y lo leen todos los componentes
+    cube = get_aggregate_cube(df, data_version)
     
     # Calcular métricas
-    metrics = calculate_summary_metrics(df)
+    metrics = calculate_summary_metrics(df, cube)
     
-    # Calcular usuarios por estrato
-    usuarios_123 = df[df['es_123'] == True]['numero_usuarios_comuna'].sum() if 'es_123' in df.columns else 0
-    usuarios_456 = df[df['es_123'] == False]['numero_usuarios_comuna'].sum() if 'es_123' in df.columns else 0
+    # Usuarios por estrato
+    _, por_estrato = cube_totals(cube)
+    usuarios_123 = por_estrato[True]['numero_usuarios_comuna'] if por_estrato[True] else 0
+    usuarios_456 = por_estrato[False]['numero_usuarios_comuna'] if por_estrato[False] else 0
     
     # TARJETA DE USUARIOS - MEJORADA
     st.markdown("<h2 style='text-align: center;'>👥 USUARIOS LEGALIZADOS</h2>", unsafe_allow_html=True)
@@ -132,6 +169,8 @@ def render_overview_page(df):
     opciones_comuna, opcion_a_nombre = get_comunas_formateadas(df)
     
     if opciones_comuna:
+        aplicar_clic_en_grid(opciones_comuna, opcion_a_nombre)
+        
         # Crear contenedor para el filtro
         col_filtro1, col_filtro2, col_filtro3 = st.columns([1, 2, 1])
         
@@ -195,12 +234,19 @@ def render_overview_page(df):
         df_filtrado = df.copy()
         mostrar_todas = True
     
+    # Clave del HTML del grid: mismos datos + mismo filtro = mismo HTML
+    if data_version is not None:
+        grid_cache_key = (data_version, "TODAS LAS COMUNAS" if mostrar_todas else comuna_seleccionada)
+    else:
+        grid_cache_key = None
+    
     # MOSTRAR TARJETAS DE COMUNAS (filtradas o todas)
     if mostrar_todas:
-        create_tv_cards_grid(df_filtrado, "Todos")
+        create_tv_cards_grid(df_filtrado, "Todos", cache_key=grid_cache_key, cube=cube)
     else:
         # Para una comuna específica, mostrar solo esa
-        create_tv_cards_grid(df_filtrado, "Todos")
+        create_tv_cards_grid(df_filtrado, "Todos", cache_key=grid_cache_key,
+                             cube=cube, comuna_filtro=comuna_seleccionada)
     
     # ============================
     # PIE DE PÁGINA CON HORA COLOMBIA
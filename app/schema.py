@@ -0,0 +1,90 @@
+# app/schema.py - REGISTRO DE COLUMNAS DE LA TABLA DE PRESUPUESTO
+import pandas as pd
+
+# Columnas de callg_control_presupuesto_comuna_fidu que usa la aplicación y su tipo esperado
+#   'key'     -> identificador (se compara como texto, no puede venir vacío)
+#   'numeric' -> valor numérico (DECIMAL / INT en MySQL)
+BUDGET_COLUMN_TYPES = {
+    'periodo': 'key',
+    'comuna': 'key',        # Código comuna + estrato, ej: "1123" / "14456"
+    'idfiducia': 'key',
+    'presupuesto_comuna': 'numeric',
+    'restante_presupuesto_comuna': 'numeric',
+    'acumulado_legali_comuna': 'numeric',
+    'numero_usuarios_comuna': 'numeric'
+}
+
+# Columnas que lee cada consumidor del DataFrame del dashboard
+BUDGET_COLUMNS_BY_CONSUMER = {
+    'process_comuna_data': ['comuna', 'presupuesto_comuna', 'restante_presupuesto_comuna',
+                            'acumulado_legali_comuna', 'numero_usuarios_comuna'],
+    'cards': ['comuna', 'idfiducia', 'presupuesto_comuna', 'restante_presupuesto_comuna',
+              'numero_usuarios_comuna'],
+    'tables': ['comuna', 'presupuesto_comuna', 'restante_presupuesto_comuna',
+               'acumulado_legali_comuna', 'numero_usuarios_comuna'],
+    'metrics': ['comuna', 'idfiducia', 'presupuesto_comuna', 'restante_presupuesto_comuna',
+                'numero_usuarios_comuna']
+}
+
+# Columnas que identifican una fila del periodo
+BUDGET_KEY_COLUMNS = ['comuna', 'idfiducia']
+
+def get_projection(consumers=None):
+    """
+    Unión ordenada de las columnas que necesitan los consumidores indicados.
+    Sin consumidores, retorna las de todo el dashboard.
+    """
+    if consumers is None:
+        consumers = BUDGET_COLUMNS_BY_CONSUMER.keys()
+
+    needed = set()
+    for consumer in consumers:
+        if consumer not in BUDGET_COLUMNS_BY_CONSUMER:
+            raise KeyError(f"Consumidor no registrado: {consumer}")
+        needed.update(BUDGET_COLUMNS_BY_CONSUMER[consumer])
+
+    # Mantener el orden declarado en BUDGET_COLUMN_TYPES
+    return [col for col in BUDGET_COLUMN_TYPES if col in needed]
+
+def get_sum_columns(columns=None):
+    """Columnas numéricas (sumables) de una proyección"""
+    columns = columns or get_projection()
+    return [col for col in columns if BUDGET_COLUMN_TYPES.get(col) == 'numeric']
+
+def build_select(table_name, columns, where="periodo = %s"):
+    """Construir un SELECT proyectado (sin SELECT *)"""
+    unknown = [col for col in columns if col not in BUDGET_COLUMN_TYPES]
+    if unknown:
+        raise KeyError(f"Columnas no registradas: {', '.join(unknown)}")
+
+    select_list = ", ".join(f"`{col}`" for col in columns)
+    return f"""
+        SELECT {select_list}
+        FROM {table_name}
+        WHERE {where}
+        """
+
+def validate_column_types(df, columns=None):
+    """
+    Validar al cargar que el DataFrame trae las columnas registradas con el tipo esperado.
+    Retorna una lista de problemas (vacía si todo está bien).
+    """
+    columns = columns or [col for col in BUDGET_COLUMN_TYPES if col in df.columns]
+    problemas = []
+
+    for col in columns:
+        expected = BUDGET_COLUMN_TYPES.get(col)
+        if col not in df.columns:
+            problemas.append(f"falta la columna '{col}'")
+            continue
+
+        serie = df[col]
+        if expected == 'numeric' and not pd.api.types.is_numeric_dtype(serie):
+            # Valores no nulos que no se pueden convertir a número
+            invalidos = pd.to_numeric(serie, errors='coerce').isna() & serie.notna()
+            if invalidos.any():
+                problemas.append(f"'{col}' tiene {int(invalidos.sum())} valor(es) no numérico(s)")
+        elif expected == 'key' and serie.isna().any():
+            problemas.append(f"'{col}' tiene {int(serie.isna().sum())} valor(es) vacío(s)")
+
+    return problemas
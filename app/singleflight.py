@@ -0,0 +1,61 @@
+# app/singleflight.py - UNA SOLA CONSULTA EN CURSO POR LLAVE (SINGLE-FLIGHT)
+import threading
+
+class _Call:
+    """Consulta en curso: los que llegan tarde esperan `done` y reciben el mismo resultado"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Coalescencia de consultas concurrentes.
+
+    Si llega una llamada con una llave que ya tiene una consulta en curso
+    (p.ej. la misma tabla y periodo), no se lanza otra: se espera la que
+    está corriendo y se comparte su resultado (o su excepción).
+    """
+
+    def __init__(self):
+        self._calls = {}  # llave -> _Call en curso
+        self._lock = threading.Lock()
+        self._stats = {'executions': 0, 'coalesced': 0}
+
+    def do(self, key, fn):
+        """Ejecutar `fn()` una sola vez por llave entre los llamadores concurrentes"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._stats['executions'] += 1
+            else:
+                self._stats['coalesced'] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            # También KeyboardInterrupt/SystemExit: los que esperan no deben recibir None
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def stats(self):
+        """Consultas ejecutadas y llamadores que esperaron una ya en curso"""
+        with self._lock:
+            return dict(self._stats, in_flight=len(self._calls))
+
+# Instancia global (una por proceso, compartida por todas las sesiones)
+fetch_flight = SingleFlight()
@@ -0,0 +1,328 @@
+# app/snapshot.py - SNAPSHOT EN MEMORIA DEL PRESUPUESTO CON ACTUALIZACIÓN POR DELTAS
+import json
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+from pathlib import Path
+import pandas as pd
+import pyarrow as pa
+from app.cache import data_cache
+from app.config import APP_CONFIG
+from app.database import db
+from app.schema import BUDGET_KEY_COLUMNS, get_projection, validate_column_types
+from app.utils import process_comuna_data, check_aggregate_consistency, get_colombia_time
+
+logger = logging.getLogger(__name__)
+
+# Si cambia más de esta fracción de filas, sale más barato recargar todo
+DELTA_MAX_FRACTION = 0.5
+# Máximo de llaves por consulta IN (...)
+DELTA_CHUNK_SIZE = 500
+
+class BudgetSnapshotStore:
+    """
+    Mantiene en memoria el DataFrame procesado del periodo.
+
+    La primera carga trae todo; después solo se consultan las filas cuyo
+    checksum por llave (comuna, idfiducia) cambió, se procesan solo esas
+    con process_comuna_data y se mezclan con el DataFrame existente.
+    Los DataFrames publicados nunca se modifican: cada refresco crea uno nuevo.
+    """
+
+    def __init__(self, table_name, period):
+        self.table_name = table_name
+        self.period = period
+        self.df = None
+        self.fingerprint = None
+        self._checksums = {}  # llave -> checksum
+        self._aggregate_verified = False  # el GROUP BY ya cuadró con la ruta detallada
+        self._lock = threading.Lock()
+
+    def _fetch_rows(self, keys=None):
+        """Traer filas crudas (todas o solo `keys`) según el modo de consulta"""
+        if APP_CONFIG['query_mode'] == 'agregado' and (keys is None or self._aggregate_verified):
+            df = db.fetch_aggregated_frame(self.table_name, self.period, keys=keys)
+            if df is None or df.empty or self._aggregate_verified:
+                return df
+            
+            # Carga completa sin verificar: comparar una vez contra las sumas de la
+            # ruta detallada. Si cuadran, no se vuelve a comparar; si no (o si una
+            # escritura cayó entre ambas consultas) se usan las filas detalladas,
+            # también en los deltas, y se compara de nuevo en la próxima carga completa.
+            detalle = db.fetch_all_data_frame(self.table_name, self.period)
+            if detalle is None:
+                return None
+            diferencias = check_aggregate_consistency(df, detalle)
+            if not diferencias:
+                self._aggregate_verified = True
+                return df
+            logger.warning("La agregación no cuadra con la ruta detallada (%s); usando consulta detallada",
+                           ", ".join(diferencias))
+            return detalle
+
+        # Ruta columnar: tuplas del cursor -> DataFrame, sin diccionario por fila
+        return db.fetch_all_data_frame(self.table_name, self.period, keys=keys)
+
+    def _fetch_checksums(self):
+        """Checksums por llave como diccionario, o None si la consulta falla"""
+        df = db.fetch_row_checksums(self.table_name, self.period)
+        if df is None:
+            return None
+        keys = zip(*(df[col] for col in BUDGET_KEY_COLUMNS))
+        return dict(zip(keys, df['checksum']))
+
+    def _prepare(self, df):
+        """Validar tipos y calcular columnas derivadas (solo de las filas recibidas)"""
+        problemas = validate_column_types(df, get_projection())
+        if problemas:
+            logger.warning("Datos con columnas inesperadas: %s", "; ".join(problemas))
+        return process_comuna_data(df)
+
+    def _load_full(self):
+        # Checksums ANTES que los datos: si algo cambia entre ambas consultas,
+        # el siguiente delta lo detecta y vuelve a traer esas filas
+        checksums = self._fetch_checksums()
+        df = self._fetch_rows()
+        if df is None:
+            return None
+        self._checksums = checksums or {}
+        return self._prepare(df) if not df.empty else df
+
+    def _load_delta(self, checksums):
+        """Aplicar al DataFrame actual solo las filas nuevas, cambiadas o eliminadas"""
+        changed = [key for key, checksum in checksums.items() if self._checksums.get(key) != checksum]
+        removed = set(self._checksums) - set(checksums)
+
+        if not changed and not removed:
+            return self.df
+        if len(changed) > len(checksums) * DELTA_MAX_FRACTION:
+            return None  # Demasiados cambios: recarga completa
+
+        partes = []
+        for start in range(0, len(changed), DELTA_CHUNK_SIZE):
+            rows = self._fetch_rows(keys=changed[start:start + DELTA_CHUNK_SIZE])
+            if rows is None:
+                return None
+            if not rows.empty:
+                partes.append(self._prepare(rows))
+
+        # Quitar las versiones anteriores de las filas tocadas y agregar las nuevas
+        current_keys = pd.MultiIndex.from_frame(self.df[BUDGET_KEY_COLUMNS])
+        stale = current_keys.isin(list(removed) + changed)
+        merged = pd.concat([self.df[~stale]] + partes, ignore_index=True)
+
+        self._checksums = checksums
+        return merged
+
+    def get(self, fingerprint):
+        """
+        Retornar el DataFrame procesado para la huella dada.
+        Si la huella no cambió se retorna el mismo DataFrame sin consultar.
+        """
+        with self._lock:
+            if self.df is not None and fingerprint == self.fingerprint:
+                return self.df
+
+            df = None
+            if self.df is not None and not self.df.empty and self._checksums:
+                checksums = self._fetch_checksums()
+                if checksums:
+                    df = self._load_delta(checksums)
+
+            if df is None:
+                df = self._load_full()
+
+            if df is None:
+                # Error de consulta: conservar lo último que se tenía
+                return self.df if self.df is not None else pd.DataFrame()
+
+            self.df = df
+            self.fingerprint = fingerprint
+            return df
+
+# Versión publicada de los datos. Es inmutable: un refresco publica una nueva
+# en lugar de modificar la actual (el DataFrame se trata como solo lectura).
+# source: 'bd' (consultado a MySQL) o 'disco' (último guardado localmente)
+Snapshot = namedtuple('Snapshot', ['version', 'df', 'fingerprint', 'published_at', 'source'])
+
+def save_snapshot(snapshot, path):
+    """Guardar el snapshot como archivo Arrow IPC (escritura atómica)"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    table = pa.Table.from_pandas(snapshot.df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[b'snapshot'] = json.dumps({
+        'version': snapshot.version,
+        'fingerprint': list(snapshot.fingerprint),
+        'published_at': snapshot.published_at.isoformat()
+    }).encode('utf-8')
+    table = table.replace_schema_metadata(metadata)
+
+    tmp_path = path.with_suffix(path.suffix + '.tmp')
+    with pa.OSFile(str(tmp_path), 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+def load_snapshot(path):
+    """Cargar el snapshot guardado; None si no existe o está dañado"""
+    path = Path(path)
+    if not path.exists():
+        return None
+    try:
+        # Se convierte completo a pandas (una sola copia): no hace falta mapearlo
+        with pa.OSFile(str(path), 'rb') as source:
+            reader = pa.ipc.open_file(source)
+            info = json.loads(reader.schema.metadata[b'snapshot'])
+            df = reader.read_pandas()
+        return Snapshot(
+            version=info['version'],
+            df=df,
+            fingerprint=tuple(info['fingerprint']),
+            published_at=datetime.fromisoformat(info['published_at']),
+            source='disco'
+        )
+    except Exception:
+        logger.exception("No se pudo leer el snapshot guardado en %s", path)
+        return None
+
+class SnapshotRefresher:
+    """
+    Refrescador único por proceso.
+
+    Un hilo en segundo plano consulta la huella cada `interval` segundos y,
+    si cambió, actualiza el BudgetSnapshotStore y publica un Snapshot nuevo
+    con versión incremental. Las sesiones solo leen el último publicado, así
+    la carga sobre MySQL no depende de cuántas pantallas estén conectadas.
+    """
+
+    def __init__(self, store, interval=30, snapshot_path=None):
+        self.store = store
+        self.interval = interval
+        self.snapshot_path = snapshot_path
+        self.last_check = None    # Hora Colombia de la última consulta exitosa
+        self.last_error = None
+        self._snapshot = None
+        self._version = 0
+        self._thread = None
+        self._wakeup = threading.Event()
+        self._published = threading.Condition()
+        self._listeners = []      # fn(anterior, publicado) por cada versión nueva
+
+    def _probe(self):
+        """Huella del periodo; si la sonda falla se usa una ventana de tiempo"""
+        fingerprint = db.get_data_fingerprint(self.store.table_name, self.store.period)
+        if fingerprint is None:
+            return None, ('sin-huella', int(time.time() // APP_CONFIG['cache_ttl']))
+        return fingerprint, fingerprint
+
+    def refresh_now(self):
+        """
+        Consultar y publicar una versión nueva si los datos cambiaron.
+        Solo la llama el hilo del refrescador (las sesiones usan request_refresh).
+        """
+        probe, fingerprint = self._probe()
+        # Leerlo ya: las consultas siguientes del mismo hilo lo reemplazan
+        probe_error = db.last_error() if probe is None else None
+        df = self.store.get(fingerprint)
+
+        published = None
+        with self._published:
+            current = self._snapshot
+            is_new = df is not None and (current is None or df is not current.df)
+            # Un DataFrame vacío solo se publica si la consulta realmente respondió
+            # (así, con MySQL caído, se sigue sirviendo el snapshot del disco)
+            if is_new and (probe is not None or not df.empty):
+                self._version += 1
+                published = Snapshot(self._version, df, fingerprint, get_colombia_time(), 'bd')
+                self._snapshot = published
+                # Lo derivado del snapshot anterior (p.ej. HTML del grid) ya no sirve
+                data_cache.invalidate(self.store.table_name, self.store.period)
+            if probe is not None:
+                self.last_check = get_colombia_time()
+                self.last_error = None
+            else:
+                self.last_error = probe_error or "No se pudo consultar la base de datos"
+            self._published.notify_all()
+
+        if published is not None and not published.df.empty and self.snapshot_path:
+            try:
+                save_snapshot(published, self.snapshot_path)
+            except Exception:
+                logger.exception("No se pudo guardar el snapshot en disco")
+        if published is not None:
+            self._notify(current, published)
+        return self._snapshot
+
+    def add_listener(self, fn):
+        """
+        Llamar fn(anterior, publicado) cada vez que se publique una versión nueva
+        (anterior puede ser None). Corre en el hilo del refrescador: debe ser rápida.
+        """
+        self._listeners.append(fn)
+
+    def _notify(self, previous, published):
+        for fn in list(self._listeners):
+            try:
+                fn(previous, published)
+            except Exception:
+                logger.exception("Error notificando la versión %s del snapshot", published.version)
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh_now()
+            except Exception as e:
+                self.last_error = str(e)
+                logger.exception("Error refrescando el snapshot del presupuesto")
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+
+    def start(self):
+        """
+        Arrancar el hilo (idempotente). Si aún no hay datos publicados se
+        sirve de inmediato el último snapshot guardado en disco.
+        """
+        with self._published:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            if self._snapshot is None and self.snapshot_path:
+                stored = load_snapshot(self.snapshot_path)
+                if stored is not None:
+                    self._snapshot = stored
+                    self._version = stored.version
+            self._thread = threading.Thread(
+                target=self._run, name="snapshot-refresher", daemon=True
+            )
+            self._thread.start()
+
+    def request_refresh(self):
+        """Pedir una consulta inmediata (p.ej. botón ACTUALIZAR)"""
+        self.start()
+        self._wakeup.set()
+
+    def latest(self, timeout=30):
+        """
+        Último Snapshot publicado. La primera vez espera (hasta `timeout`
+        segundos) a que el hilo publique; retorna None si no hay datos.
+        """
+        self.start()
+        with self._published:
+            if self._snapshot is None:
+                self._published.wait_for(
+                    lambda: self._snapshot is not None or self.last_error is not None,
+                    timeout=timeout
+                )
+            return self._snapshot
+
+# Instancias globales (una por proceso, compartidas por todas las sesiones)
+budget_store = BudgetSnapshotStore(APP_CONFIG['table_name'], APP_CONFIG['current_period'])
+refresher = SnapshotRefresher(
+    budget_store,
+    interval=APP_CONFIG['refresh_interval'],
+    snapshot_path=APP_CONFIG['snapshot_path']
+)
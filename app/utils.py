@@ -3,6 +3,7 @@ import pandas as pd
 import numpy as np
 import re
 from app.config import COMUNA_MAPPING
+from app.schema import get_sum_columns
 from datetime import datetime, timedelta
 
 # Mapeo de números de comuna (debería estar en config o importarse de cards.py)
@@ -30,6 +31,52 @@ COMUNA_NUMEROS = {
     "SANTA ELENA": "90"
 }
 
+# Patrón "Nombre - Documento" (compilado una sola vez)
+PATRON_NOMBRE_DOCUMENTO = re.compile(r'(.+?)\s*-\s*(\d+)')
+
+def extraer_nombre_y_documento(texto):
+    """
+    Extrae nombre y documento de un string con formato "Nombre - Documento"
+    """
+    if not isinstance(texto, str):
+        return ("No disponible", "")
+    
+    match = PATRON_NOMBRE_DOCUMENTO.search(texto)
+    
+    if match:
+        nombre = match.group(1).strip()
+        documento = match.group(2).strip()
+        return (nombre, documento)
+    else:
+        return (texto.strip(), "")
+
+def extraer_nombres_y_documentos(nombres):
+    """
+    Versión vectorizada de extraer_nombre_y_documento para una Serie completa.
+    Cada nombre distinto se analiza una sola vez (la vista repite el mismo
+    nombre en todas las citas de la persona) y el resultado se reparte a todas
+    las filas por posición. Retorna un DataFrame con columnas 'nombre_persona'
+    y 'documento', con el mismo índice y los mismos casos borde.
+    """
+    # Nulos (None / NaN) quedan con código -1
+    codigos, unicos = pd.factorize(nombres, use_na_sentinel=True)
+    partes = [extraer_nombre_y_documento(valor) for valor in unicos]
+    # Al final va el resultado de los nulos: el código -1 apunta a esa posición
+    partes.append(("No disponible", ""))
+
+    nombres_unicos = np.empty(len(partes), dtype=object)
+    documentos_unicos = np.empty(len(partes), dtype=object)
+    nombres_unicos[:] = [nombre for nombre, _ in partes]
+    documentos_unicos[:] = [documento for _, documento in partes]
+
+    return pd.DataFrame(
+        {
+            'nombre_persona': nombres_unicos[codigos],
+            'documento': documentos_unicos[codigos]
+        },
+        index=nombres.index
+    )
+
 def format_currency(value):
     """Formatear valor como moneda SIN REDONDEAR - mostrar completo"""
     if pd.isna(value) or value is None:
@@ -116,7 +163,10 @@ def process_comuna_data(df):
     for col in numeric_columns:
         if col in df.columns:
             # Convertir a float primero para manejar NaN, luego a int
-            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+            # (los DataFrames de la ruta columnar ya llegan numéricos)
+            if not pd.api.types.is_numeric_dtype(df[col]):
+                df[col] = pd.to_numeric(df[col], errors='coerce')
+            df[col] = df[col].fillna(0)
             # Convertir a enteros (redondear hacia abajo)
             df[col] = df[col].astype(int)
         else:
@@ -141,8 +191,29 @@ def process_comuna_data(df):
     
     return df
 
-def calculate_summary_metrics(df):
-    """Calcular métricas resumidas del dataset - VALORES ENTEROS"""
+def check_aggregate_consistency(df_agregado, df_detalle):
+    """
+    Comparar, ya procesadas con process_comuna_data, las sumas de las filas
+    agregadas en MySQL contra las de las filas detalladas del mismo periodo.
+    process_comuna_data trunca cada fila a entero: si la tabla guarda
+    decimales, truncar la suma del GROUP BY no da lo mismo que sumar las filas
+    truncadas que pintaba la ruta detallada. Retorna la lista de columnas que
+    no cuadran (vacía si todo es consistente).
+    """
+    agregado = process_comuna_data(df_agregado.copy())
+    detalle = process_comuna_data(df_detalle.copy())
+    
+    diferencias = []
+    for col in get_sum_columns():
+        if int(agregado[col].sum()) != int(detalle[col].sum()):
+            diferencias.append(col)
+    return diferencias
+
+def calculate_summary_metrics(df, cube=None):
+    """
+    Calcular métricas resumidas del dataset - VALORES ENTEROS
+    Con `cube` (cubo de agregados de los mismos datos) se leen sus totales sin volver a sumar.
+    """
     if df.empty:
         return {
             'total_presupuesto': 0,
@@ -152,10 +223,16 @@ def calculate_summary_metrics(df):
             'porcentaje_utilizacion': 0
         }
     
-    total_presupuesto = int(df['presupuesto_comuna'].sum())
-    total_restante = int(df['restante_presupuesto_comuna'].sum())
-    total_usuarios = int(df['numero_usuarios_comuna'].sum())
-    total_comunas = df['Nombre Comuna'].nunique() if 'Nombre Comuna' in df.columns else 0
+    if cube is not None:
+        total_presupuesto = cube.total['presupuesto_comuna']
+        total_restante = cube.total['restante_presupuesto_comuna']
+        total_usuarios = cube.total['numero_usuarios_comuna']
+        total_comunas = cube.total['comunas']
+    else:
+        total_presupuesto = int(df['presupuesto_comuna'].sum())
+        total_restante = int(df['restante_presupuesto_comuna'].sum())
+        total_usuarios = int(df['numero_usuarios_comuna'].sum())
+        total_comunas = df['Nombre Comuna'].nunique() if 'Nombre Comuna' in df.columns else 0
     
     if total_presupuesto > 0:
         porcentaje_utilizacion = ((total_presupuesto - total_restante) / total_presupuesto * 100)
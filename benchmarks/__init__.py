@@ -0,0 +1 @@
+# Este archivo hace que benchmarks sea un paquete
\ No newline at end of file
@@ -0,0 +1,76 @@
+# benchmarks/bench_citas_parsing.py - EXTRACCIÓN DE NOMBRE Y DOCUMENTO: .apply VS VECTORIZADA
+#
+# Uso (desde la raíz del repositorio):
+#   python -m benchmarks.bench_citas_parsing [--filas 300000] [--citas-por-persona 4]
+#
+# --citas-por-persona 1 es el peor caso (ningún nombre se repite).
+"""Extracción de nombre y documento de las citas: .apply fila por fila vs vectorizada."""
+import argparse
+import random
+import time
+import numpy as np
+import pandas as pd
+from app.utils import extraer_nombre_y_documento, extraer_nombres_y_documentos
+
+NOMBRES = ["ANA MARIA", "JUAN CARLOS", "LUZ DARY", "JOSE LUIS", "MARTHA CECILIA", "ANDRES FELIPE"]
+APELLIDOS = ["GOMEZ", "RESTREPO", "ZAPATA", "OSPINA", "MUÑOZ", "CARDONA", "VELEZ"]
+
+def generar_nombres(filas, citas_por_persona=4, seed=42):
+    """
+    Nombres sintéticos con la mezcla de formatos que llega de la vista.
+    Cada persona aparece en varias citas, como en la vista real.
+    """
+    rng = random.Random(seed)
+    personas = []
+    for _ in range(max(1, filas // citas_por_persona)):
+        persona = f"{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}"
+        documento = rng.randint(1_000_000, 1_999_999_999)
+        caso = rng.random()
+        if caso < 0.80:
+            personas.append(f"{persona} - {documento}")
+        elif caso < 0.90:
+            personas.append(f"  {persona}-{documento}  ")
+        elif caso < 0.95:
+            personas.append(f"{persona}")                      # sin documento
+        elif caso < 0.98:
+            personas.append(None)
+        else:
+            personas.append(np.nan)
+    return pd.Series([rng.choice(personas) for _ in range(filas)], dtype=object)
+
+def con_apply(nombres):
+    """Implementación anterior: una llamada Python por fila"""
+    extracciones = nombres.apply(extraer_nombre_y_documento)
+    return pd.DataFrame(
+        extracciones.tolist(), index=nombres.index, columns=['nombre_persona', 'documento']
+    )
+
+def medir(funcion, nombres, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion(nombres)
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos), resultado
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--filas', type=int, default=300_000)
+    parser.add_argument('--citas-por-persona', type=int, default=4)
+    parser.add_argument('--repeticiones', type=int, default=3)
+    args = parser.parse_args()
+
+    nombres = generar_nombres(args.filas, args.citas_por_persona)
+    t_apply, esperado = medir(con_apply, nombres, args.repeticiones)
+    t_vector, obtenido = medir(extraer_nombres_y_documentos, nombres, args.repeticiones)
+
+    # Ambas versiones deben dar exactamente lo mismo, incluidos los casos borde
+    pd.testing.assert_frame_equal(esperado, obtenido, check_dtype=False)
+
+    print(f"Filas:        {args.filas:,} ({nombres.nunique(dropna=False):,} nombres distintos)")
+    print(f".apply:       {t_apply * 1000:,.1f} ms")
+    print(f"vectorizada:  {t_vector * 1000:,.1f} ms")
+    print(f"Aceleración:  {t_apply / t_vector:,.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# benchmarks/bench_fiducias_grid.py - DATOS DEL GRID: ESCANEO POR COMUNA VS PARTICIÓN AGRUPADA
+#
+# Uso (desde la raíz del repositorio):
+#   python -m benchmarks.bench_fiducias_grid [--repeticiones 3]
+#
+# Escala comunas y fiducias por comuna. El escaneo por comuna crece como
+# comunas x filas; la partición agrupada crece con las filas (µs/fila ~constante).
+"""Datos del grid de fiducias: escaneo por comuna vs partición agrupada."""
+import argparse
+import random
+import time
+import pandas as pd
+from app.aggregates import build_aggregate_cube
+from app.components.cards import partition_fiducias, build_fiducias_sections_html
+
+COMUNAS = [30, 120, 480]
+FIDUCIAS_POR_COMUNA = [5, 20, 80]
+
+def generar_datos(comunas, fiducias_por_comuna, seed=7):
+    """Filas ya procesadas (como las deja process_comuna_data) para ambos estratos"""
+    rng = random.Random(seed)
+    filas = []
+    for c in range(comunas):
+        nombre = f"COMUNA {c:03d}"
+        for es_123 in (True, False):
+            for f in range(fiducias_por_comuna):
+                presupuesto = rng.randint(10**6, 10**9)
+                restante = rng.randint(0, presupuesto)
+                filas.append({
+                    'Comuna Base': nombre,
+                    'es_123': es_123,
+                    'idfiducia': str(f),
+                    'presupuesto_comuna': presupuesto,
+                    'restante_presupuesto_comuna': restante,
+                    'acumulado_legali_comuna': presupuesto - restante,
+                    'numero_usuarios_comuna': rng.randint(0, 200),
+                    'Nombre Comuna': f"{c:03d} - {nombre}"
+                })
+    return pd.DataFrame(filas)
+
+def particion_por_escaneo(df):
+    """Implementación anterior: un filtro booleano por comuna y estrato"""
+    columnas = ['idfiducia', 'presupuesto_comuna', 'restante_presupuesto_comuna']
+    df_123 = df[df['es_123'] == True].copy()
+    df_456 = df[df['es_123'] == False].copy()
+    particiones = {}
+    for comuna in sorted(df['Comuna Base'].unique()):
+        for es_123, df_estrato in ((True, df_123), (False, df_456)):
+            df_comuna = df_estrato[df_estrato['Comuna Base'] == comuna]
+            if not df_comuna.empty:
+                particiones[(comuna, es_123)] = df_comuna[columnas].copy()
+    return particiones
+
+def medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos), resultado
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeticiones', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'comunas':>8} {'fid/com':>8} {'filas':>8} | {'escaneo ms':>11} {'µs/fila':>8} | "
+          f"{'agrupada ms':>11} {'µs/fila':>8} | {'kiosco html ms':>14}")
+    for comunas in COMUNAS:
+        for fiducias in FIDUCIAS_POR_COMUNA:
+            df = generar_datos(comunas, fiducias)
+            filas = len(df)
+
+            t_escaneo, esperado = medir(lambda: particion_por_escaneo(df), args.repeticiones)
+            t_agrupada, obtenido = medir(lambda: partition_fiducias(df), args.repeticiones)
+
+            # Mismas particiones, mismas filas y en el mismo orden
+            assert esperado.keys() == obtenido.keys()
+            for llave, parte in esperado.items():
+                pd.testing.assert_frame_equal(parte, obtenido[llave])
+
+            cube = build_aggregate_cube(df)
+            orden = sorted(df['Comuna Base'].unique())
+            t_html, _ = medir(lambda: build_fiducias_sections_html(orden, obtenido, cube), 1)
+
+            print(f"{comunas:>8} {fiducias:>8} {filas:>8} | {t_escaneo * 1000:>11.1f} "
+                  f"{t_escaneo * 1e6 / filas:>8.2f} | {t_agrupada * 1000:>11.1f} "
+                  f"{t_agrupada * 1e6 / filas:>8.2f} | {t_html * 1000:>14.1f}")
+
+if __name__ == "__main__":
+    main()
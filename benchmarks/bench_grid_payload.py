@@ -0,0 +1,57 @@
+# benchmarks/bench_grid_payload.py - BYTES DEL GRID POR REFRESCO: DOCUMENTO HTML VS PAYLOAD EN VIVO
+#
+# Uso (desde la raíz del repositorio):
+#   python -m benchmarks.bench_grid_payload
+#
+# Compara lo que viaja al navegador en cada refresco del dashboard:
+#   antes   -> documento HTML completo (components.html) con el CSS en un <style>
+#              y el <link> a fonts.googleapis.com
+#   en vivo -> payload JSON del componente (el CSS se descarga una vez de /assets)
+"""Bytes del grid por refresco: documento HTML con CSS en línea vs payload del componente."""
+import json
+from app.aggregates import build_aggregate_cube
+from app.assets import asset_manifest
+from app.components import cards
+from app.components.cards import (
+    GRID_STYLESHEETS, build_fiducias_payload, build_fiducias_sections_html, partition_fiducias
+)
+from benchmarks.bench_grid_render import FIDUCIAS, generar_fiducias
+
+# Encabezado anterior: fuentes de Google + CSS del grid en línea
+GOOGLE_FONTS_LINK = (
+    '<link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;600;700;800'
+    '&family=Roboto:wght@400;500;700;900&display=swap" rel="stylesheet">'
+)
+
+def documento_anterior(secciones):
+    """Documento que se enviaba en cada refresco: <head> con el CSS en línea + secciones"""
+    css = asset_manifest.get(asset_manifest.url('css/grid.css'))[0].decode('utf-8')
+    return (
+        '<!DOCTYPE html><html><head><meta charset="UTF-8">'
+        f'{GOOGLE_FONTS_LINK}<style>\n{css}</style></head><body>'
+        f'<div class="fiducias-container"><div class="comunas-sections">{secciones}</div></div>'
+        '</body></html>'
+    )
+
+def kb(texto):
+    return len(texto.encode('utf-8')) / 1024
+
+def main():
+    estaticos = sum(len(asset_manifest.get(asset_manifest.url(ruta))[0]) for ruta in GRID_STYLESHEETS)
+    print(f"CSS de assets/ (una sola descarga, caché de un año): {estaticos / 1024:.1f} KB")
+    print(f"{'fiducias':>9} | {'antes KB':>9} | {'en vivo KB':>10} {'-%':>6}")
+    for cantidad in FIDUCIAS:
+        df = generar_fiducias(cantidad)
+        orden = sorted(df['Comuna Base'].unique())
+        particiones = partition_fiducias(df)
+        cube = build_aggregate_cube(df)
+
+        cards._SECTION_HTML_CACHE.clear()
+        antes = documento_anterior(build_fiducias_sections_html(orden, particiones, cube))
+        en_vivo = json.dumps(build_fiducias_payload(orden, particiones, cube))
+
+        print(f"{cantidad:>9} | {kb(antes):>9.1f} | {kb(en_vivo):>10.1f} "
+              f"{(1 - kb(en_vivo) / kb(antes)) * 100:>5.1f}%")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+# benchmarks/bench_grid_render.py - RENDER DE TARJETAS: F-STRINGS + ITERROWS VS PLANTILLAS JINJA2
+#
+# Uso (desde la raíz del repositorio):
+#   python -m benchmarks.bench_grid_render [--repeticiones 5]
+#
+# Mide la tarjeta de fiducias y las secciones del grid del kiosco (sin caché de
+# secciones) de 20 a 2.000 fiducias, y verifica que el HTML sea idéntico.
+"""Render de las tarjetas del grid: f-strings con iterrows vs plantillas Jinja2."""
+import argparse
+import random
+import time
+import pandas as pd
+from app.aggregates import build_aggregate_cube
+from app.components import cards
+from app.components.cards import (
+    create_fiducias_card, partition_fiducias, build_fiducias_sections_html,
+    format_currency_complete, get_status_color_tv
+)
+
+FIDUCIAS = [20, 200, 2000]
+COMUNAS = 21
+
+def generar_fiducias(cantidad, seed=11):
+    """Filas de fiducias repartidas entre COMUNAS comunas y ambos estratos"""
+    rng = random.Random(seed)
+    filas = []
+    for i in range(cantidad):
+        presupuesto = rng.randint(10**6, 10**9)
+        restante = rng.randint(0, presupuesto)
+        filas.append({
+            'Comuna Base': f"COMUNA {i % COMUNAS:02d}",
+            'es_123': (i // COMUNAS) % 2 == 0,
+            'idfiducia': str(1000 + i),
+            'presupuesto_comuna': presupuesto,
+            'restante_presupuesto_comuna': restante,
+            'acumulado_legali_comuna': presupuesto - restante,
+            'numero_usuarios_comuna': rng.randint(0, 200),
+            'Nombre Comuna': f"{i % COMUNAS:02d} - COMUNA {i % COMUNAS:02d}"
+        })
+    return pd.DataFrame(filas)
+
+# Referencia: implementación anterior de create_fiducias_card
+def tarjeta_con_iterrows(fiducias_data, estrato_text, has_data=True):
+    """Implementación anterior: iterrows + f-strings concatenadas con +="""
+    
+    if not has_data or fiducias_data.empty:
+        return f'''
+        <div class="fiducias-card no-data">
+            <div class="fiducias-header no-data">
+                <div class="fiducias-title">FIDUCIAS {estrato_text}</div>
+            </div>
+            <div class="no-data-state">
+                <div class="no-data-icon">📭</div>
+                <div class="no-data-title">NO APLICA</div>
+                <div class="no-data-text">Esta comuna no tiene {estrato_text.replace("ESTRATOS ", "")}</div>
+            </div>
+        </div>
+        '''
+    
+    # Ordenar fiducias por mayor a menor presupuesto
+    fiducias_data = fiducias_data.sort_values('presupuesto_comuna', ascending=False)
+    
+    # Generar HTML para cada fiducia
+    fiducias_html = ""
+    for _, fiducia in fiducias_data.iterrows():
+        fiducia_id = fiducia.get('idfiducia', 'N/A')
+        
+        # Asegurar que los valores sean enteros
+        try:
+            presupuesto = int(float(fiducia['presupuesto_comuna']))
+            restante = int(float(fiducia['restante_presupuesto_comuna']))
+        except (ValueError, TypeError):
+            presupuesto = 0
+            restante = 0
+            
+        consumido = presupuesto - restante
+        porcentaje = (consumido / presupuesto * 100) if presupuesto > 0 else 0
+        bar_color = get_status_color_tv(porcentaje)
+        
+        fiducias_html += f'''
+        <div class="fiducia-item">
+            <div class="fiducia-header">
+                <div class="fiducia-id">Fiducia {fiducia_id}</div>
+                <div class="fiducia-porcentaje" style="color: {bar_color};">{porcentaje:.1f}%</div>
+            </div>
+            
+            <div class="fiducias-metrics">
+                <div class="fiducia-metric">
+                    <div class="fiducia-metric-label">Presupuesto</div>
+                    <div class="fiducia-metric-value">{format_currency_complete(presupuesto)}</div>
+                </div>
+                <div class="fiducia-metric">
+                    <div class="fiducia-metric-label">Restante</div>
+                    <div class="fiducia-metric-value available">{format_currency_complete(restante)}</div>
+                </div>
+            </div>
+            
+            <div class="fiducias-progress">
+                <div class="fiducia-progress-bar">
+                    <div class="fiducia-progress-fill" style="width: {porcentaje}%; background: {bar_color};"></div>
+                </div>
+            </div>
+        </div>
+        '''
+    
+    return f'''
+    <div class="fiducias-card">
+        <div class="fiducias-header">
+            <div class="fiducias-title">📦 FIDUCIAS {estrato_text}</div>
+            <div class="fiducias-count">{len(fiducias_data)} fiducia(s)</div>
+        </div>
+        
+        <div class="fiducias-list">
+            {fiducias_html}
+        </div>
+    </div>
+    '''
+
+def medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos), resultado
+
+def grid_sin_cache(df):
+    """Secciones del kiosco regenerando todas (sin aciertos en la caché)"""
+    cards._SECTION_HTML_CACHE.clear()
+    orden = sorted(df['Comuna Base'].unique())
+    return build_fiducias_sections_html(orden, partition_fiducias(df), build_aggregate_cube(df))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'fiducias':>9} | {'tarjeta f-string ms':>19} {'tarjeta jinja ms':>16} {'x':>5} | {'secciones kiosco ms':>19}")
+    for cantidad in FIDUCIAS:
+        df = generar_fiducias(cantidad)
+        columnas = ['idfiducia', 'presupuesto_comuna', 'restante_presupuesto_comuna']
+        una_tarjeta = df[columnas]  # todas las fiducias en una sola tarjeta
+
+        t_antes, esperado = medir(lambda: tarjeta_con_iterrows(una_tarjeta, "ESTRATOS 1-3"), args.repeticiones)
+        t_ahora, obtenido = medir(lambda: create_fiducias_card(una_tarjeta, "ESTRATOS 1-3"), args.repeticiones)
+        assert esperado == obtenido, "El HTML de la tarjeta cambió"
+
+        t_grid, _ = medir(lambda: grid_sin_cache(df), args.repeticiones)
+
+        print(f"{cantidad:>9} | {t_antes * 1000:>19.1f} {t_ahora * 1000:>16.1f} "
+              f"{t_antes / t_ahora:>5.1f} | {t_grid * 1000:>19.1f}")
+
+if __name__ == "__main__":
+    main()